@@ -1,27 +1,98 @@
-from flask import Flask, render_template, jsonify
-import mysql.connector
+from flask import Flask, Response, render_template, jsonify
+import json
 import os
+import threading
 from dotenv import load_dotenv
 from flask import request 
+from datetime import datetime
+from src.plate_utils import normalize_plate_number
+from src.storage import StorageError, create_storage
+from src.events import DetectionTailer, EventBus
+from src.metrics import REGISTRY, read_snapshot_file, render_prometheus, summarize
 
 # Load environment variables
 load_dotenv()
 
 app = Flask(__name__)
 
-# Function to establish DB connection
-def get_db_connection():
-    try:
-        conn = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='priyanshu',
-            database='vehicle_tracking'
-        )
-        return conn
-    except mysql.connector.Error as err:
-        print(f"Error: {err}")
-        return None
+# Storage backend, shared with the tracker when the dashboard runs in-process
+storage = None
+# Tracker's whitelist cache, refreshed right away on whitelist edits when shared
+whitelist_cache = None
+
+# New detections are pushed to dashboard clients over /events
+event_bus = EventBus()
+detection_tailer = None
+_init_lock = threading.Lock()
+# Whether the tracker runs in this process, so its metrics are in the local registry
+embedded = False
+
+def init_app(shared_storage=None, shared_whitelist_cache=None):
+    """Attach the dashboard to a storage backend and start the live detection feed"""
+    global storage, whitelist_cache, detection_tailer, embedded
+    with _init_lock:
+        if storage is not None:
+            return app
+        embedded = shared_storage is not None
+        if shared_storage is None:
+            # Standalone: backend selected by ANPR_DB_BACKEND (MySQL or embedded SQLite)
+            shared_storage = create_storage()
+            shared_storage.setup()
+        storage = shared_storage
+        whitelist_cache = shared_whitelist_cache
+        detection_tailer = DetectionTailer(storage, event_bus)
+        detection_tailer.start()
+    return app
+
+@app.before_request
+def ensure_initialized():
+    if storage is None:
+        init_app()
+
+def start_server(host='127.0.0.1', port=5000, shared_storage=None, shared_whitelist_cache=None):
+    """
+    Serve the dashboard from a background thread of the calling process
+
+    The listening socket is bound before this returns, so the dashboard is
+    ready for requests as soon as it does.
+
+    Returns:
+        werkzeug.serving.BaseWSGIServer: Running server, stop it with shutdown()
+    """
+    from werkzeug.serving import make_server
+
+    init_app(shared_storage, shared_whitelist_cache)
+    server = make_server(host, port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="dashboard", daemon=True).start()
+    print(f"Dashboard serving on http://{host}:{port}")
+    return server
+
+def whitelist_changed():
+    if whitelist_cache is not None:
+        whitelist_cache.notify_changed()
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Keyset cursor "<detection time>_<id>" pointing at the last row of a page
+def encode_cursor(row):
+    return f"{row['detection_time'].strftime('%Y-%m-%dT%H:%M:%S')}_{row['id']}"
+
+def decode_cursor(cursor):
+    detection_time, row_id = cursor.rsplit("_", 1)
+    return datetime.fromisoformat(detection_time), int(row_id)
+
+def format_detection(row):
+    return {
+        "id": row["id"],
+        "plateNo": row["plate_number"],
+        "type": row["vehicle_type"],
+        "confidenceScore": round(row["confidence"] * 100, 2),
+        "image": row["capture_path"],
+        # Rows saved before thumbnails existed fall back to the full capture
+        "thumbnail": row["thumbnail_path"] or row["capture_path"],
+        "detectionTime": row["detection_time"].strftime('%d-%m-%y/%I:%M %p')
+    }
 
 @app.route('/')
 @app.route('/home')
@@ -30,37 +101,70 @@ def index():
 
 @app.route('/get_data')
 def get_data():
-    conn = get_db_connection()
-    
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        query = "SELECT id, plate_number, vehicle_type, confidence, capture_path, detection_time FROM detected_vehicles ORDER BY detection_time DESC"
-        cursor.execute(query)
-        data = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        
-        formatted_data = [
-            {
-                "id": row["id"],
-                "plateNo": row["plate_number"],
-                "type": row["vehicle_type"],
-                "confidenceScore": round(row["confidence"] * 100, 2),
-                "image": row["capture_path"],
-                "detectionTime": row["detection_time"].strftime('%d-%m-%y/%I:%M %p')
-            }
-            for row in data
-        ]
-        
-        return jsonify(formatted_data)
+    try:
+        limit = min(int(request.args.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        before = decode_cursor(request.args["cursor"]) if request.args.get("cursor") else None
+        since = datetime.fromisoformat(request.args["since"]) if request.args.get("since") else None
+        until = datetime.fromisoformat(request.args["until"]) if request.args.get("until") else None
+    except ValueError:
+        return jsonify({"error": "Invalid limit, cursor or time range"}), 400
+    if limit < 1:
+        return jsonify({"error": "Invalid limit, cursor or time range"}), 400
+
+    try:
+        # Fetch one extra row to know whether another page follows
+        data = storage.recent_detections(limit=limit + 1, before=before, since=since, until=until)
+    except StorageError as err:
+        print(f"Error: {err}")
+        return jsonify({"error": "Database connection failed"}), 500
+
+    formatted_data = [format_detection(row) for row in data[:limit]]
+    next_cursor = encode_cursor(data[limit - 1]) if len(data) > limit else None
     
-    return jsonify({"error": "Database connection failed"}), 500
+    return jsonify({"items": formatted_data, "nextCursor": next_cursor})
+
+@app.route('/events')
+def events():
+    subscription = event_bus.subscribe()
+
+    def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                row = subscription.get(timeout=15)
+                if row is None:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: detection\ndata: {json.dumps(format_detection(row))}\n\n"
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return Response(stream(), mimetype="text/event-stream", headers=headers)
+
+def metric_families():
+    """Tracker metrics, from the shared registry or the snapshot the tracker process exports"""
+    metrics_file = os.getenv('ANPR_METRICS_FILE')
+    if not embedded and metrics_file:
+        families = read_snapshot_file(metrics_file)
+        if families is not None:
+            return families
+    return REGISTRY.snapshot()
+
+@app.route('/metrics')
+def metrics():
+    return Response(render_prometheus(metric_families()), mimetype='text/plain; version=0.0.4')
+
+@app.route('/metrics/summary')
+def metrics_summary():
+    return jsonify(summarize(metric_families()))
 
 @app.route('/add_to_whitelist', methods=['POST'])
 def add_to_whitelist():
     data = request.json
     owner_name = data.get("name")
-    plate_number = data.get("plateNo")
+    plate_number = normalize_plate_number(data.get("plateNo"))
     vehicle_type = data.get("type")
 
     if not owner_name or not plate_number or not vehicle_type:
@@ -71,56 +175,46 @@ def add_to_whitelist():
     if vehicle_type not in valid_types:
         return jsonify({"error": "Invalid vehicle type"}), 400
 
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor()
-        query = "INSERT INTO whitelist_vehicles (owner_name, plate_number, vehicle_type) VALUES (%s, %s, %s)"
-        cursor.execute(query, (owner_name, plate_number, vehicle_type))
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return jsonify({"message": "Added to whitelist"}), 201
+    try:
+        storage.add_whitelist(owner_name, plate_number, vehicle_type)
+    except StorageError as err:
+        print(f"Error: {err}")
+        return jsonify({"error": "Database connection failed"}), 500
+    whitelist_changed()
 
-    return jsonify({"error": "Database connection failed"}), 500
+    return jsonify({"message": "Added to whitelist"}), 201
 
 @app.route('/get_whitelist')
 def get_whitelist():
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor(dictionary=True)
-        query = "SELECT id, owner_name, plate_number, vehicle_type FROM whitelist_vehicles"
-        cursor.execute(query)
-        data = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        
-        formatted_data = [
-            {
-                "id": row["id"],
-                "name": row["owner_name"],
-                "plateNo": row["plate_number"],
-                "type": row["vehicle_type"]
-            }
-            for row in data
-        ]
-        
-        return jsonify(formatted_data)
+    try:
+        data = storage.list_whitelist()
+    except StorageError as err:
+        print(f"Error: {err}")
+        return jsonify({"error": "Database connection failed"}), 500
+
+    formatted_data = [
+        {
+            "id": row["id"],
+            "name": row["owner_name"],
+            "plateNo": row["plate_number"],
+            "type": row["vehicle_type"]
+        }
+        for row in data
+    ]
     
-    return jsonify({"error": "Database connection failed"}), 500
+    return jsonify(formatted_data)
 
 @app.route('/remove_from_whitelist/<int:id>', methods=['DELETE'])
 def remove_from_whitelist(id):
-    conn = get_db_connection()
-    if conn:
-        cursor = conn.cursor()
-        query = "DELETE FROM whitelist_vehicles WHERE id = %s"
-        cursor.execute(query, (id,))
-        conn.commit()
-        cursor.close()
-        conn.close()
-        return jsonify({"message": "Removed from whitelist"}), 200
-    
-    return jsonify({"error": "Database connection failed"}), 500
+    try:
+        storage.remove_whitelist(id)
+    except StorageError as err:
+        print(f"Error: {err}")
+        return jsonify({"error": "Database connection failed"}), 500
+    whitelist_changed()
+
+    return jsonify({"message": "Removed from whitelist"}), 200
 
 if __name__ == '__main__':
+    init_app()
     app.run(debug=True)
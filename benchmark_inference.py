@@ -0,0 +1,65 @@
+import argparse
+import json
+import time
+
+from src.inference import LeanYoloRunner, UltralyticsRunner
+from src.replay import latency_summary, read_frames
+from src.tracking import iou
+
+
+def benchmark_runner(runner, frames, threshold):
+    """Time one backend over the frames, keeping its detections above the threshold"""
+    seconds = []
+    detections = []
+    for frame in frames:
+        start = time.perf_counter()
+        found = runner.predict(frame)
+        seconds.append(time.perf_counter() - start)
+        detections.append(found[found[:, 4] > threshold])
+    return seconds, detections
+
+
+def agreement(reference, candidate, min_iou=0.5):
+    """Share of the reference boxes the candidate backend found as well, matched by IoU"""
+    total = 0
+    matched = 0
+    for expected, found in zip(reference, candidate):
+        for box in expected[:, :4].tolist():
+            total += 1
+            matched += any(iou(box, other) >= min_iou for other in found[:, :4].tolist())
+    return round(matched / total, 3) if total else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the lean TFLite/ONNX backend with Ultralytics inference")
+    parser.add_argument("source", help="recorded video file or directory of images")
+    parser.add_argument("--model", default="models/best_float16.tflite", help="detection model to run")
+    parser.add_argument("--threads", type=int, help="inference threads of the lean backend")
+    parser.add_argument("--threshold", type=float, default=0.5, help="confidence above which detections count")
+    parser.add_argument("--every", type=int, default=1, help="use every n-th frame")
+    parser.add_argument("--warm-up", type=int, default=3, help="untimed frames run first by each backend")
+    args = parser.parse_args()
+
+    frames = list(read_frames(args.source, args.every))
+    runners = {
+        'ultralytics': UltralyticsRunner(args.model),
+        'lean': LeanYoloRunner(args.model, num_threads=args.threads)
+    }
+
+    report = {'frames': len(frames)}
+    detections = {}
+    for name, runner in runners.items():
+        for frame in frames[:args.warm_up]:
+            runner.predict(frame)
+        seconds, detections[name] = benchmark_runner(runner, frames, args.threshold)
+        report[name] = dict(
+            latency_summary({'predict': seconds})['predict'] if seconds else {},
+            fps=round(len(seconds) / sum(seconds), 2) if seconds else 0.0,
+            detections=sum(len(found) for found in detections[name])
+        )
+    report['lean_matches_ultralytics'] = agreement(detections['ultralytics'], detections['lean'])
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
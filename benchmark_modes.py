@@ -0,0 +1,90 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from main import VehicleTracker
+from src.indicators import MockGPIO
+from src.pipeline import FramePacket
+from src.plate_utils import normalize_plate_number
+from src.replay import load_ground_truth, read_frames
+from src.storage import SQLiteStorage
+
+
+def benchmark_mode(tracker, mode, frames):
+    """Run the detection and OCR stages of one mode over the frames, without persistence"""
+    frame_count = 0
+    tracker.detection_mode = mode
+    # Start without tracks, so the plates read by the previous mode are not reused
+    tracker.vehicle_tracks.tracks.clear()
+    stages = [stage for name, stage in tracker.detection_stages() if name != 'persist']
+    plates = set()
+    plate_frames = 0
+    ocr_calls, ocr_ms = tracker.ocr_calls, tracker.ocr_ms
+
+    start = time.perf_counter()
+    for frame_id, frame in enumerate(frames):
+        frame_count += 1
+        packet = FramePacket(frame_id, frame)
+        for stage in stages:
+            packet = stage(packet)
+            if packet is None:
+                break
+        if packet is not None:
+            plate_frames += 1
+            plates.update(normalize_plate_number(plate_number) for _, _, plate_number, _ in packet.plates)
+            plates.update(normalize_plate_number(plate_number) for _, plate_number, _, _ in packet.ended)
+    # Tracks still open at the end of the footage emit their consensus as well
+    plates.update(track.final_plate() for track in tracker.vehicle_tracks.tracks if track.final_plate())
+    elapsed = time.perf_counter() - start
+
+    return {
+        'frames': frame_count,
+        'seconds': round(elapsed, 3),
+        'fps': round(frame_count / elapsed, 2) if elapsed else 0.0,
+        'frames_with_plates': plate_frames,
+        'ocr_calls': tracker.ocr_calls - ocr_calls,
+        'ocr_ms': round(tracker.ocr_ms - ocr_ms, 1),
+        'plates': sorted(plates)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare FPS and recall of the vehicle-first and plate-first modes")
+    parser.add_argument("source", help="recorded video file or directory of images")
+    parser.add_argument("--ground-truth", help="CSV file with a plate_number column")
+    parser.add_argument("--every", type=int, default=1, help="use every n-th frame")
+    parser.add_argument("--multi-vehicle", action="store_true", help="read every vehicle in the frame")
+    args = parser.parse_args()
+
+    truth = load_ground_truth(args.ground_truth) if args.ground_truth else None
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        tracker = VehicleTracker(
+            capture_folder=os.path.join(work_dir, "captures"),
+            storage=SQLiteStorage(os.path.join(work_dir, "benchmark.db")),
+            gpio=MockGPIO(),
+            multi_vehicle=args.multi_vehicle
+        )
+        report = {}
+        try:
+            tracker.models.wait()
+            report['startup'] = tracker.models.timings
+            for mode in ("vehicle-first", "plate-first"):
+                # Decode the footage again for each mode instead of holding every frame in memory
+                result = benchmark_mode(tracker, mode, read_frames(args.source, args.every))
+                if truth:
+                    found = truth & set(result['plates'])
+                    result['recall'] = round(len(found) / len(truth), 3)
+                    result['false_plates'] = len(set(result['plates']) - truth)
+                report[mode] = result
+            report['ocr_strategies'] = tracker.plate_recognizer.strategy_report()
+        finally:
+            tracker._cleanup()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
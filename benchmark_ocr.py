@@ -0,0 +1,86 @@
+import argparse
+import csv
+import json
+import os
+import time
+
+import cv2
+
+from src.plate_utils import normalize_plate_number
+from src.recognize_plate import PlateRecognizer
+
+
+def read_plate_images(path):
+    """(file name, image) of every readable image in a directory of plate crops"""
+    images = []
+    for name in sorted(os.listdir(path)):
+        image = cv2.imread(os.path.join(path, name))
+        if image is not None:
+            images.append((name, image))
+    return images
+
+
+def load_labels(path):
+    """file name -> plate number, from a CSV file with filename and plate_number columns"""
+    with open(path, newline="") as f:
+        return {row["filename"]: normalize_plate_number(row["plate_number"]) for row in csv.DictReader(f)}
+
+
+def benchmark_path(recognizer, images, recognition_only, batch_size, labels=None):
+    """Read every plate crop with or without the recognition-only pass"""
+    recognizer.recognition_only = recognition_only
+    for record in recognizer.strategy_stats.values():
+        record.update(attempts=0, successes=0, ms=0.0)
+
+    read = 0
+    correct = 0
+    attempts = 0
+    by_recognition = 0
+    start = time.perf_counter()
+    for offset in range(0, len(images), batch_size):
+        batch = images[offset:offset + batch_size]
+        results = recognizer.read_plates([image for _, image in batch])
+        for (name, _), (plate_number, _), plate_read in zip(batch, results, recognizer.last_reads):
+            attempts += plate_read['attempts']
+            if plate_number:
+                read += 1
+                by_recognition += plate_read['strategy'] == 'recognition'
+            if labels and normalize_plate_number(plate_number) == labels.get(name):
+                correct += 1
+    elapsed = time.perf_counter() - start
+
+    result = {
+        'plates': len(images),
+        'read': read,
+        'read_by_recognition_only': by_recognition,
+        'seconds': round(elapsed, 3),
+        'ms_per_plate': round(elapsed * 1000 / len(images), 1) if images else 0.0,
+        'attempts_per_plate': round(attempts / len(images), 2) if images else 0.0,
+        'strategies': recognizer.strategy_report()
+    }
+    if labels:
+        labelled = sum(1 for name, _ in images if name in labels)
+        result['accuracy'] = round(correct / labelled, 3) if labelled else None
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare recognition-only OCR with the full PaddleOCR pipeline")
+    parser.add_argument("source", help="directory of plate crop images")
+    parser.add_argument("--labels", help="CSV file with filename and plate_number columns")
+    parser.add_argument("--batch-size", type=int, default=8, help="plates handed to the recognizer at once")
+    args = parser.parse_args()
+
+    images = read_plate_images(args.source)
+    labels = load_labels(args.labels) if args.labels else None
+    recognizer = PlateRecognizer()
+
+    report = {
+        'full-pipeline': benchmark_path(recognizer, images, False, args.batch_size, labels),
+        'recognition-only': benchmark_path(recognizer, images, True, args.batch_size, labels)
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
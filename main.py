@@ -1,367 +1,499 @@
+import argparse
 import subprocess
+import sys
+import tempfile
+import threading
 import time
 import cv2
+from collections import deque
 import os
-import mysql.connector
 from datetime import datetime
-from typing import Optional, Dict
-
-# Add GPIO import
-import RPi.GPIO as GPIO
-
-try:
-    from picamera2 import Picamera2  
-except:
-    print("Error: 'picamera2' module not found. Install it using: ")
-    print("sudo apt install python3-picamera2")
-    exit(1)
+from dotenv import load_dotenv
+from typing import Optional
 
 try:
     from src.detect_vehicle import VehicleDetector
     from src.recognize_plate import PlateRecognizer
     from src.detect_plate import PlateDetector
-    from src.open_dashboard import open_dashboard
+    from src.open_dashboard import open_dashboard, wait_for_dashboard
+    from src.pipeline import DetectionPipeline, DropOldestQueue, FramePacket
+    from src.indicators import LEDIndicator
+    from src.plate_utils import normalize_plate_number
+    from src.whitelist_cache import WhitelistCache
+    from src.persistence import DetectionRecord, DetectionWriter
+    from src.storage import Storage, create_storage
+    from src.tracking import MultiObjectTracker
+    from src.motion import MotionGate, parse_roi
+    from src.scheduler import AdaptiveScheduler
+    from src.sightings import PlateSighting, SightingBuffer
+    from src.image_store import ImageStore
+    from src.retention import RetentionManager
+    from src.startup import ModelLoader
+    from src.detections import Detection, Detections
+    from src.metrics import (FRAMES, QUEUE_DEPTH, REGISTRY, SCHEDULER_FPS, SCHEDULER_FRAME_COST_SECONDS,
+                             SCHEDULER_INTERVAL, SCHEDULER_MODE, STAGE_SECONDS, MetricsFileExporter)
 except ImportError as e:
     raise ImportError(f"Required module not found: {e}")
 
 class VehicleTracker:
-    def __init__(self, capture_folder: str = "static/captured_vehicles", db_config: Optional[Dict] = None):
-        self.vehicle_detector = VehicleDetector()
-        self.plate_detector = PlateDetector()
-        self.plate_recognizer = PlateRecognizer()
-        
+    def __init__(self, capture_folder: str = "static/captured_vehicles", storage: Optional[Storage] = None,
+                 gpio=None, whitelist_cache: Optional[WhitelistCache] = None, multi_vehicle: bool = False,
+                 detection_mode: str = "vehicle-first", classify_every_n: int = 5,
+                 motion_gate: Optional[MotionGate] = None, held_frames: int = 32):
+        # The models load and warm up in parallel in the background, overlapping the rest of the setup
+        self.models = ModelLoader({
+            'vehicle': VehicleDetector,
+            'plate': PlateDetector,
+            'ocr': PlateRecognizer
+        })
+        self.models.start()
+        # Frames captured before the models are ready, motion-gated, processed once they are
+        self.held_frames = deque(maxlen=held_frames)
+        self.multi_vehicle = multi_vehicle
+        # Frames without motion in the region of interest skip the models entirely
+        self.motion_gate = motion_gate
+        # Chooses which captured frames are processed, from measured stage latency and track activity
+        self.scheduler = AdaptiveScheduler()
+        # "vehicle-first" runs both models on every frame, "plate-first" skips the vehicle model
+        # until a plate is found and then classifies only every classify_every_n plate frames
+        self.detection_mode = detection_mode
+        self.classify_every_n = classify_every_n
+        self._plate_frames = 0
+        self._vehicle_cache = Detections()
+        self._vehicle_cache_time = 0.0
+        # Vehicle tracks across frames, so each vehicle's plate is read once instead of every frame
+        self.vehicle_tracks = MultiObjectTracker()
+        # Guards the tracks and sightings, which the capture loop finalizes while stage threads update them
+        self._tracks_lock = threading.RLock()
+        self.ocr_calls = 0
+        self.ocr_skipped = 0
+        self.ocr_attempts = 0
+        self.ocr_ms = 0.0
+
         self.capture_folder = capture_folder
         os.makedirs(self.capture_folder, exist_ok=True)
 
-        self.cleanup_old_images(days=5)
-        self.detected_vehicles: Dict[str, Dict] = {}
+        # Best sighting per plate, holding only the vehicle crop; a background sweeper
+        # persists each plate as soon as it has not been seen for 10 seconds
+        self.detected_vehicles = SightingBuffer(quiet_window=10.0, on_evict=self.persist_sighting)
         
-        self.db_config = db_config or {
-            'host': 'localhost',
-            'user': 'root',
-            'password': "priyanshu",
-            'database': 'vehicle_tracking'
-        }
-        self.db_connection = None
-        self.db_cursor = None
+        self.storage = storage or create_storage()
+        self.db_ready = False
         self.setup_database()
 
-        # Setup GPIO for two LEDs
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setwarnings(False)
+        if whitelist_cache is None:
+            whitelist_cache = WhitelistCache(self.storage)
+            whitelist_cache.start()
+        self.whitelist_cache = whitelist_cache
+
+        self.image_store = ImageStore(self.capture_folder, jpeg_quality=int(os.getenv('ANPR_JPEG_QUALITY', '85')))
+        self.detection_writer = DetectionWriter(
+            self.storage,
+            self.capture_folder,
+            on_saved=self.on_detection_saved,
+            image_store=self.image_store
+        )
+        self.detection_writer.start()
+        self.detected_vehicles.start()
+
+        # Deletes old detections, rows and images together, in the background
+        max_capture_mb = os.getenv('ANPR_MAX_CAPTURE_MB')
+        self.retention = RetentionManager(
+            self.storage,
+            self.image_store,
+            max_age_days=int(os.getenv('ANPR_RETENTION_DAYS', '5')),
+            max_bytes=int(max_capture_mb) * 1024 * 1024 if max_capture_mb else None
+        )
+        self.retention.start()
+
+        QUEUE_DEPTH.set_function(self.detection_writer.pending, queue='writer')
+        QUEUE_DEPTH.set_function(lambda: len(self.detected_vehicles), queue='sightings')
+        # Scheduling decisions, read from the scheduler whenever the metrics are collected
+        SCHEDULER_INTERVAL.set_function(lambda: self.scheduler.interval)
+        SCHEDULER_MODE.set_function(lambda: self.scheduler.active, mode='active')
+        SCHEDULER_MODE.set_function(lambda: not self.scheduler.active, mode='idle')
+        SCHEDULER_FPS.set_function(lambda: self.scheduler.metrics()['camera_fps'], kind='camera')
+        SCHEDULER_FPS.set_function(lambda: self.scheduler.metrics()['processing_fps'], kind='processing')
+        SCHEDULER_FRAME_COST_SECONDS.set_function(self.scheduler.frame_cost)
+        # A dashboard running in another process serves the metrics from this snapshot file
+        metrics_file = os.getenv('ANPR_METRICS_FILE')
+        self.metrics_exporter = MetricsFileExporter(REGISTRY, metrics_file) if metrics_file else None
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.start()
+
+        # Setup GPIO for two LEDs, pulsed from a background scheduler thread
         self.WHITELIST_LED_PIN = 18  # LED for whitelist matches
         self.DB_LED_PIN = 15        # LED for database saves
-        GPIO.setup(self.WHITELIST_LED_PIN, GPIO.OUT)
-        GPIO.setup(self.DB_LED_PIN, GPIO.OUT)
-        GPIO.output(self.WHITELIST_LED_PIN, GPIO.LOW)
-        GPIO.output(self.DB_LED_PIN, GPIO.LOW)
-
-    def cleanup_old_images(self, days: int = 5):
-        """Deletes images older than the specified number of days."""
-        now = time.time()
-        cutoff_time = now - (days * 86400)
-
-        for filename in os.listdir(self.capture_folder):
-            file_path = os.path.join(self.capture_folder, filename)
-            if os.path.isfile(file_path):
-                file_creation_time = os.path.getctime(file_path)
-                if file_creation_time < cutoff_time:
-                    os.remove(file_path)
-                    print(f"Deleted old image: {filename}")
-    
+        self.indicators = LEDIndicator([self.WHITELIST_LED_PIN, self.DB_LED_PIN], gpio=gpio)
+
+    @property
+    def vehicle_detector(self) -> VehicleDetector:
+        return self.models.get('vehicle')
+
+    @property
+    def plate_detector(self) -> PlateDetector:
+        return self.models.get('plate')
+
+    @property
+    def plate_recognizer(self) -> PlateRecognizer:
+        return self.models.get('ocr')
+
     def setup_database(self) -> None:
         """Set up database connection and create required tables"""
-        try:
-            self.db_connection = mysql.connector.connect(**self.db_config)
-            self.db_cursor = self.db_connection.cursor()
-            
-            create_table_query = """
-            CREATE TABLE IF NOT EXISTS detected_vehicles (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                plate_number VARCHAR(20) NOT NULL,
-                vehicle_type VARCHAR(20) NOT NULL,
-                confidence FLOAT NOT NULL,
-                capture_path VARCHAR(255),
-                detection_time DATETIME NOT NULL
-            )
-            """
-            create_table_query2 = """
-            CREATE TABLE IF NOT EXISTS whitelist_vehicles (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                owner_name VARCHAR(60) NOT NULL,
-                plate_number VARCHAR(20) NOT NULL,
-                vehicle_type VARCHAR(20) NOT NULL
-            );
-            """
-            self.db_cursor.execute(create_table_query)
-            print("Created/verified 'detected_vehicles' table")
-            self.db_cursor.execute(create_table_query2)
-            print("Created/verified 'whitelist_vehicles' table")
-            self.db_connection.commit()
-            print("Database connection established and tables verified")
-            
-        except mysql.connector.Error as err:
-            print(f"Database error: {err}")
-            self.db_connection = None
-            self.db_cursor = None
+        self.db_ready = self.storage.setup()
 
     def normalize_plate_number(self, plate_number: str) -> str:
-        """Remove dots from the plate number."""
-        return plate_number.replace(".", "")
+        """Strip separators and upper-case the plate number."""
+        return normalize_plate_number(plate_number)
     
-    def save_to_database(self, plate_number: str, vehicle_type: str, confidence: float, 
-                        capture_path: str) -> bool:
-        """Save vehicle detection information to database"""
-        if not self.db_connection or not self.db_cursor:
+    def test_database_connection(self) -> bool:
+        """Test that the storage backend is set up and reachable"""
+        if not self.db_ready:
             print("Database connection not available")
             return False
+        return self.storage.ping()
         
-        try:
-            normalized_plate_number = self.normalize_plate_number(plate_number)
+    def check_whitelist(self, plate_number: str) -> bool:
+        """Check if the plate number exists in the in-memory whitelist index."""
+        return self.whitelist_cache.contains(plate_number)
 
-            insert_query = """
-            INSERT INTO detected_vehicles 
-            (plate_number, vehicle_type, confidence, capture_path, detection_time)
-            VALUES (%s, %s, %s, %s, %s)
-            """
-            detection_time = datetime.now()
-            
-            self.db_cursor.execute(insert_query, (
-                normalized_plate_number, vehicle_type, confidence, capture_path, detection_time
-            ))
-            self.db_connection.commit()
-            print(f"Saved to database: Plate {normalized_plate_number}, Type {vehicle_type}, Path {capture_path}")
-            return True
-            
-        except mysql.connector.Error as err:
-            print(f"Error saving to database: {err}")
-            self.db_connection.rollback()
-            return False
+    def turn_on_whitelist_led(self, duration: float = 5.0):
+        """Turn on the whitelist LED for a specified duration without blocking."""
+        self.indicators.pulse(self.WHITELIST_LED_PIN, duration)
+
+    def turn_on_db_led(self, duration: float = 5.0):
+        """Turn on the database LED for a specified duration without blocking."""
+        self.indicators.pulse(self.DB_LED_PIN, duration)
     
-    def test_database_connection(self) -> bool:
-        """Test database connection by inserting a test record"""
-        if not self.db_connection or not self.db_cursor:
-            print("Database connection not available")
-            return False
-        else:
-            return True
-        
-    def check_existing_plate(self, plate_number: str) -> Optional[Dict]:
-        """Check if plate number exists in database and return its details."""
-        if not self.db_connection or not self.db_cursor:
-            print("Database connection not available")
+    def motion_stage(self, packet: FramePacket) -> Optional[FramePacket]:
+        """Drop frames without motion in the region of interest and remember where the motion is"""
+        if packet.motion_box is not None:
+            # Already gated while it was held during model loading
+            return packet
+        packet.motion_box = self.motion_gate.check(packet.frame, packet.timestamp)
+        if packet.motion_box is None:
+            FRAMES.labels(result='no_motion').inc()
             return None
-        
-        try:
-            query = """
-            SELECT plate_number, vehicle_type, confidence, capture_path
-            FROM detected_vehicles
-            WHERE plate_number = %s
-            ORDER BY detection_time DESC
-            LIMIT 1
-            """
-            self.db_cursor.execute(query, (plate_number,))
-            result = self.db_cursor.fetchone()
-            if result:
-                return {
-                    'plate_number': result[0],
-                    'vehicle_type': result[1],
-                    'confidence': result[2],
-                    'capture_path': result[3]
-                }
+        return packet
+
+    def motion_region(self, packet: FramePacket):
+        """Part of the frame the models should look at, with its x and y offset in the frame"""
+        if packet.motion_box is None:
+            return packet.frame, 0, 0
+        x1, y1, x2, y2 = packet.motion_box
+        return packet.frame[y1:y2, x1:x2], x1, y1
+
+    def detect_vehicle_stage(self, packet: FramePacket) -> Optional[FramePacket]:
+        """Find the confident vehicles in the frame, or drop the frame if there are none"""
+        region, offset_x, offset_y = self.motion_region(packet)
+        vehicle_detections = self.vehicle_detector.detect(region).above(0.7)
+        if not len(vehicle_detections):
+            return None
+
+        # Without multi-vehicle mode only the most confident vehicle is read
+        vehicle_detections = vehicle_detections.top(None if self.multi_vehicle else 1)
+        packet.vehicles = list(vehicle_detections.shifted(offset_x, offset_y))
+        return packet
+
+    def locate_plates(self, packet: FramePacket) -> None:
+        """Find the best plate inside each detected vehicle region"""
+        vehicle_regions = [packet.frame[y1:y2, x1:x2] for x1, y1, x2, y2 in (vehicle.box for vehicle in packet.vehicles)]
+        if len(vehicle_regions) == 1:
+            plate_detections_per_vehicle = [self.plate_detector.detect_plate(vehicle_regions[0])]
+        else:
+            # One batched plate-model call for all vehicles in the frame
+            plate_detections_per_vehicle = self.plate_detector.detect_plates_batch(vehicle_regions)
+
+        for vehicle, plate_detections in zip(packet.vehicles, plate_detections_per_vehicle):
+            x1, y1 = vehicle.box[:2]
+            plate = plate_detections.shifted(x1, y1).best()
+            if plate is not None:
+                packet.candidates.append((vehicle, plate.box))
+
+    def read_plate_stage(self, packet: FramePacket) -> Optional[FramePacket]:
+        """
+        Read the text of every located plate
+
+        Vehicles are matched to tracks first; OCR only runs while a track's plate vote is
+        unsettled: for a new track, when the plate crop is clearly larger or sharper than
+        the best one read for that track, or every few frames. A plate is emitted once
+        its vote is stable, or with the consensus so far when the track ends.
+        """
+        with self._tracks_lock:
+            tracks = self.vehicle_tracks.update([vehicle.box for vehicle in packet.vehicles], packet.timestamp)
+            packet.ended.extend(self.ended_plates(self.vehicle_tracks.expired))
+        track_by_vehicle = {id(vehicle): track for vehicle, track in zip(packet.vehicles, tracks)}
+
+        located = []
+        pending = []
+        for vehicle, plate_box in packet.candidates:
+            px1, py1, px2, py2 = plate_box
+            plate_region = packet.frame[py1:py2, px1:px2]
+            if plate_region.size == 0:
+                continue
+
+            track = track_by_vehicle[id(vehicle)]
+            if track.best_vehicle is None or vehicle.confidence >= track.best_vehicle.confidence:
+                track.best_vehicle, track.best_frame = vehicle, packet.frame
+            located.append((vehicle, plate_box, track))
+            if track.needs_ocr(plate_region):
+                pending.append((track, plate_region))
+            else:
+                self.ocr_skipped += 1
+
+        if pending:
+            # All plates of the frame that need reading go to the recognizer together
+            results = self.plate_recognizer.read_plates([plate_region for _, plate_region in pending])
+            for (track, plate_region), (plate_number, confidence), read in zip(
+                    pending, results, self.plate_recognizer.last_reads):
+                with self._tracks_lock:
+                    track.record_ocr(plate_region, plate_number, confidence)
+                self.ocr_calls += 1
+                self.ocr_attempts += read['attempts']
+                self.ocr_ms += read['ms']
+
+        for vehicle, plate_box, track in located:
+            if track.plate_number:
+                packet.plates.append((vehicle, plate_box, track.plate_number, track.track_id))
+
+        if not packet.plates and not packet.ended:
             return None
-        except mysql.connector.Error as err:
-            print(f"Error querying database: {err}")
+        return packet
+
+    @staticmethod
+    def ended_plates(tracks) -> list:
+        """(vehicle, plate text, frame, timestamp) of the ended tracks whose vote has a consensus"""
+        return [
+            (track.best_vehicle, track.final_plate(), track.best_frame, track.last_seen)
+            for track in tracks if track.final_plate()
+        ]
+
+    def finalize_tracks(self, timestamp: float) -> list:
+        """
+        Record the plates of tracks that ended without a frame reaching the OCR stage
+
+        Called for every captured frame, so a vehicle is finalized as soon as it
+        leaves even if nothing else passes the motion gate afterwards. The
+        timestamp must not be later than any frame still on its way to the OCR
+        stage; pass infinity to finalize every open track.
+
+        Returns:
+            list: (vehicle, plate text, frame, timestamp) of the finalized tracks
+        """
+        with self._tracks_lock:
+            ended = self.ended_plates(self.vehicle_tracks.expire(timestamp))
+            for vehicle, plate_number, frame, ended_at in ended:
+                self.track_plate(frame, ended_at, vehicle, plate_number)
+        return ended
+
+    def tracks_active(self, timestamp: float) -> bool:
+        """Whether any vehicle track is still alive, so frames should be sampled faster"""
+        return bool(self.vehicle_tracks.active_tracks(timestamp))
+
+    def ocr_report(self) -> dict:
+        """OCR counters: plates read, reads reused from tracks, attempts and milliseconds per plate"""
+        return {
+            'calls': self.ocr_calls,
+            'reused': self.ocr_skipped,
+            'attempts_per_plate': round(self.ocr_attempts / self.ocr_calls, 2) if self.ocr_calls else None,
+            'ms_per_plate': round(self.ocr_ms / self.ocr_calls, 1) if self.ocr_calls else None,
+            'strategies': self.plate_recognizer.strategy_report()
+        }
+
+    def recognize_plate_stage(self, packet: FramePacket) -> Optional[FramePacket]:
+        """Locate the plate inside each vehicle region and read its text"""
+        self.locate_plates(packet)
+        return self.read_plate_stage(packet)
+
+    def detect_plate_first_stage(self, packet: FramePacket) -> Optional[FramePacket]:
+        """
+        Run the plate model on the full frame and classify vehicles only when a plate is found.
+
+        The vehicle model runs on every classify_every_n-th frame that contains a plate; in
+        between, plates are matched against the most recent vehicle detections.
+        """
+        region, offset_x, offset_y = self.motion_region(packet)
+        plate_detections = self.plate_detector.detect_plate(region)
+        if not len(plate_detections):
             return None
 
-    def delete_existing_entry(self, plate_number: str) -> bool:
-        """Delete an existing entry and its capture file from the database and folder."""
-        if not self.db_connection or not self.db_cursor:
-            print("Database connection not available")
-            return False
-        
-        try:
-            # Get the capture path to delete the file
-            existing = self.check_existing_plate(plate_number)
-            if existing and existing['capture_path'] and os.path.exists(existing['capture_path']):
-                os.remove(existing['capture_path'])
-                print(f"Deleted old capture file: {existing['capture_path']}")
-            
-            # Delete from database
-            delete_query = "DELETE FROM detected_vehicles WHERE plate_number = %s"
-            self.db_cursor.execute(delete_query, (plate_number,))
-            self.db_connection.commit()
-            print(f"Deleted existing database entry for plate: {plate_number}")
-            return True
-        except mysql.connector.Error as err:
-            print(f"Error deleting from database: {err}")
-            self.db_connection.rollback()
-            return False
-        
-    def check_whitelist(self, plate_number: str) -> bool:
-        """Check if the plate number exists in the whitelist."""
-        if not self.db_connection or not self.db_cursor:
-            print("Database connection not available")
-            return False
-        
-        try:
+        plate_detections = plate_detections.top(None if self.multi_vehicle else 1).shifted(offset_x, offset_y)
+
+        self._plate_frames += 1
+        stale = packet.timestamp - self._vehicle_cache_time > 1.0
+        if stale or self._plate_frames % self.classify_every_n == 0:
+            self._vehicle_cache = self.vehicle_detector.detect(region).shifted(offset_x, offset_y)
+            self._vehicle_cache_time = packet.timestamp
+
+        # Plates inside the same vehicle share one Detection, so they map to one track
+        vehicles_by_box = {}
+        for plate in plate_detections:
+            px1, py1, px2, py2 = plate.box
+            vehicle = self._vehicle_cache.containing((px1 + px2) / 2, (py1 + py2) / 2).best()
+            if vehicle is None:
+                # No vehicle box around this plate: fall back to the plate box and confidence
+                vehicle = Detection(plate.box, plate.confidence, label="Unknown")
+            shared = vehicles_by_box.setdefault(vehicle.box, vehicle)
+            if shared is vehicle:
+                # First plate in this vehicle; later plates only add candidates, not another track
+                packet.vehicles.append(vehicle)
+            packet.candidates.append((shared, plate.box))
+        return packet
+
+    def detection_stages(self):
+        """(name, stage) pairs of the configured detection mode, in processing order"""
+        if self.detection_mode == "plate-first":
+            stages = [
+                ('plate', self.detect_plate_first_stage),
+                ('ocr', self.read_plate_stage),
+                ('persist', self.track_detection_stage)
+            ]
+        else:
+            stages = [
+                ('vehicle', self.detect_vehicle_stage),
+                ('plate', self.recognize_plate_stage),
+                ('persist', self.track_detection_stage)
+            ]
+        if self.motion_gate is not None:
+            stages.insert(0, ('motion', self.motion_stage))
+        return stages
+
+    def track_detection_stage(self, packet: FramePacket) -> FramePacket:
+        """Update the in-memory tracking state and persist finished detections"""
+        with self._tracks_lock:
+            for vehicle, plate_number, frame, timestamp in packet.ended:
+                self.track_plate(frame, timestamp, vehicle, plate_number)
+            for vehicle, _, plate_number, _ in packet.plates:
+                self.track_plate(packet.frame, packet.timestamp, vehicle, plate_number)
+        return packet
+
+    def track_plate(self, frame, current_time: float, vehicle, plate_number: str) -> None:
+        """
+        Record one recognized plate, keeping its best sighting until it is persisted
+
+        The background sweeper persists a plate once it goes quiet; a plate whose best
+        sighting is over 10 seconds old is persisted on its next sighting as well, so a
+        vehicle that stays in view still gets a row.
+        """
+        vehicle_type, vehicle_conf = vehicle.label, vehicle.confidence
+        normalized_plate_number = self.normalize_plate_number(plate_number)
+
+        # Check whitelist status
+        in_whitelist = self.check_whitelist(normalized_plate_number)
+
+        # Turn on whitelist LED for 5 seconds if in whitelist
+        if in_whitelist:
+            print(f"Vehicle {normalized_plate_number} found in whitelist - Turning on Whitelist LED for 5 seconds")
+            self.turn_on_whitelist_led(5.0)
+
+        # Track vehicle in memory
+        previous_detection = self.detected_vehicles.get(normalized_plate_number)
+        if previous_detection is not None and current_time - previous_detection.timestamp >= 10:
+            # Hand the finished detection to the writer; the DB LED is lit once it is committed
+            self.save_highest_confidence_detection(normalized_plate_number)
+            previous_detection = None
+
+        if previous_detection is None or vehicle_conf > previous_detection.confidence:
+            x1, y1, x2, y2 = vehicle.box
+            self.detected_vehicles.put(PlateSighting(
+                plate_number=normalized_plate_number,
+                original_plate=plate_number,
+                vehicle_type=vehicle_type,
+                confidence=vehicle_conf,
+                timestamp=current_time,
+                crop=frame[y1:y2, x1:x2].copy()
+            ))
+        else:
+            self.detected_vehicles.touch(normalized_plate_number, current_time)
+
+    def annotate_frame(self, frame, packet: FramePacket):
+        """Draw the vehicle boxes, plate boxes and recognized text of a packet onto a frame"""
+        for vehicle, plate_box, plate_number, track_id in packet.plates:
+            x1, y1, x2, y2 = vehicle.box
+            px1, py1, px2, py2 = plate_box
             normalized_plate_number = self.normalize_plate_number(plate_number)
-            query = "SELECT COUNT(*) FROM whitelist_vehicles WHERE plate_number = %s"
-            self.db_cursor.execute(query, (normalized_plate_number,))
-            count = self.db_cursor.fetchone()[0]
-            return count > 0
-        except mysql.connector.Error as err:
-            print(f"Error checking whitelist: {err}")
-            return False
+            display_text = f"#{track_id} {vehicle.label} - {normalized_plate_number} ({vehicle.confidence:.2f})"
+            cv2.putText(frame, display_text, (x1, y1 - 10),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
+            cv2.rectangle(frame, (px1, py1), (px2, py2), (255, 0, 0), 2)
+        return frame
 
-    def turn_on_whitelist_led(self, duration: float = 5.0):
-        """Turn on the whitelist LED for a specified duration."""
-        GPIO.output(self.WHITELIST_LED_PIN, GPIO.HIGH)
-        time.sleep(duration)
-        GPIO.output(self.WHITELIST_LED_PIN, GPIO.LOW)
+    def record_stage(self, name: str, seconds: float) -> None:
+        """Feed a stage latency to the scheduler and the stage latency metric"""
+        self.scheduler.record(name, seconds)
+        STAGE_SECONDS.labels(stage=name).observe(seconds)
 
-    def turn_on_db_led(self, duration: float = 5.0):
-        """Turn on the database LED for a specified duration."""
-        GPIO.output(self.DB_LED_PIN, GPIO.HIGH)
-        time.sleep(duration)
-        GPIO.output(self.DB_LED_PIN, GPIO.LOW)
-    
-    def process_frame(self, frame):
-        """Process a single video frame for vehicle and plate detection"""
+    def admit_frame(self, timestamp: float) -> bool:
+        """Ask the scheduler whether a captured frame is processed, counting the outcome"""
+        admitted = self.scheduler.should_process(timestamp, self.tracks_active(timestamp))
+        FRAMES.labels(result='processed' if admitted else 'skipped').inc()
+        return admitted
+
+    def hold_frame(self, packet: FramePacket) -> None:
+        """Keep a frame captured while the models load, if the motion gate passes it"""
+        if self.motion_gate is not None and self.motion_stage(packet) is None:
+            return
+        FRAMES.labels(result='held').inc()
+        self.held_frames.append(packet)
+
+    def process_packet(self, packet: FramePacket, on_timing=None) -> Optional[FramePacket]:
+        """
+        Run a packet through every detection stage, returning None if a stage dropped it
+
+        on_timing, if given, is called with each stage name and its seconds as well.
+        """
         try:
-            vehicle_detections = self.vehicle_detector.detect(frame)
-            if not vehicle_detections:
-                return frame
-            
-            vehicle_detections.sort(key=lambda x: x[5], reverse=True)
-            x1, y1, x2, y2, vehicle_type, vehicle_conf = vehicle_detections[0]
-            
-            if vehicle_conf > 0.7:
-                vehicle_region = frame[y1:y2, x1:x2]
-                plate_detections = self.plate_detector.detect_plate(vehicle_region)
-                if not plate_detections:
-                    return frame
-                
-                plate_detections.sort(key=lambda x: x[4], reverse=True)
-                px1, py1, px2, py2, plate_conf = plate_detections[0]
-                px1, py1 = x1 + px1, y1 + py1
-                px2, py2 = x1 + px2, y1 + py2
-                
-                plate_region = frame[py1:py2, px1:px2]
-                plate_number = self.plate_recognizer.extract_text(plate_region)
-                
-                if plate_number:
-                    current_time = time.time()
-                    normalized_plate_number = self.normalize_plate_number(plate_number)
-                    
-                    # Check whitelist status
-                    in_whitelist = self.check_whitelist(normalized_plate_number)
-
-                    # Turn on whitelist LED for 5 seconds if in whitelist
-                    if in_whitelist:
-                        print(f"Vehicle {normalized_plate_number} found in whitelist - Turning on Whitelist LED for 5 seconds")
-                        self.turn_on_whitelist_led(5.0)
-
-                    # Track vehicle in memory
-                    if normalized_plate_number not in self.detected_vehicles:
-                        self.detected_vehicles[normalized_plate_number] = {
-                            'timestamp': current_time,
-                            'confidence': vehicle_conf,
-                            'vehicle_type': vehicle_type,
-                            'capture_frame': frame.copy(),
-                            'capture_path': None,
-                            'original_plate': plate_number,
-                            'saved_to_db': False
-                        }
-                    else:
-                        previous_detection = self.detected_vehicles[normalized_plate_number]
-                        time_since_last_detection = current_time - previous_detection['timestamp']
-                        
-                        if time_since_last_detection < 10:
-                            if vehicle_conf > previous_detection['confidence']:
-                                self.detected_vehicles[normalized_plate_number].update({
-                                    'timestamp': current_time,
-                                    'confidence': vehicle_conf,
-                                    'vehicle_type': vehicle_type,
-                                    'capture_frame': frame.copy(),
-                                    'original_plate': plate_number
-                                })
-                        else:
-                            # Save to DB and turn on DB LED if new entry
-                            self.save_highest_confidence_detection(normalized_plate_number)
-                            if self.detected_vehicles[normalized_plate_number].get('saved_to_db'):
-                                print(f"New plate {normalized_plate_number} added to detected_vehicles database - Turning on DB LED for 5 seconds")
-                                self.turn_on_db_led(5.0)
-                            self.detected_vehicles[normalized_plate_number] = {
-                                'timestamp': current_time,
-                                'confidence': vehicle_conf,
-                                'vehicle_type': vehicle_type,
-                                'capture_frame': frame.copy(),
-                                'capture_path': None,
-                                'original_plate': plate_number,
-                                'saved_to_db': False
-                            }
-
-                    # Annotate frame
-                    display_text = f"{vehicle_type} - {normalized_plate_number} ({vehicle_conf:.2f})"
-                    cv2.putText(frame, display_text, (x1, y1 - 10),
-                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-                    cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                    cv2.rectangle(frame, (px1, py1), (px2, py2), (255, 0, 0), 2)
-        
+            for name, stage in self.detection_stages():
+                start = time.perf_counter()
+                packet = stage(packet)
+                elapsed = time.perf_counter() - start
+                self.record_stage(name, elapsed)
+                if on_timing is not None:
+                    on_timing(name, elapsed)
+                if packet is None:
+                    return None
+            return packet
+
         except Exception as e:
             print(f"Error processing frame: {e}")
-        
+            return None
+
+    def process_held_frames(self) -> None:
+        """Process the frames held during model loading, oldest first"""
+        while self.held_frames:
+            self.process_packet(self.held_frames.popleft())
+
+    def process_frame(self, frame, timestamp: Optional[float] = None):
+        """Process a single video frame for vehicle and plate detection"""
+        packet = self.process_packet(FramePacket(0, frame, timestamp))
+        if packet is not None:
+            self.annotate_frame(frame, packet)
         return frame
 
     def save_highest_confidence_detection(self, plate_number):
-        """Save the highest confidence detection, replacing lower-confidence entries."""
-        if plate_number not in self.detected_vehicles:
-            return
-        
-        detection_data = self.detected_vehicles[plate_number]
-        normalized_plate_number = self.normalize_plate_number(plate_number)
-        
-        # Check if this plate already exists in the database
-        existing_entry = self.check_existing_plate(normalized_plate_number)
-        
-        if existing_entry:
-            # If new confidence is lower, ignore this detection
-            if detection_data['confidence'] <= existing_entry['confidence']:
-                print(f"Ignoring lower confidence detection for {normalized_plate_number}: "
-                      f"{detection_data['confidence']} <= {existing_entry['confidence']}")
-                return
-            
-            # If higher confidence, delete the old entry
-            self.delete_existing_entry(normalized_plate_number)
-        
-        # Save the new detection
-        frame_to_save = detection_data['capture_frame'].copy()
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{normalized_plate_number}_{timestamp}.jpg"
-        filepath = os.path.join(self.capture_folder, filename)
-        
-        if cv2.imwrite(filepath, frame_to_save):
-            success = self.save_to_database(
-                plate_number=normalized_plate_number,
-                vehicle_type=detection_data['vehicle_type'],
-                confidence=detection_data['confidence'],
-                capture_path=filepath
-            )
-            if success:
-                print(f"Saved highest confidence detection: {normalized_plate_number}")
-                self.detected_vehicles[normalized_plate_number]['capture_path'] = filepath
-                self.detected_vehicles[normalized_plate_number]['saved_to_db'] = True
-            else:
-                if os.path.exists(filepath):
-                    os.remove(filepath)
-                    print(f"Removed {filepath} due to database save failure")
+        """Queue the best detection of a plate for the background writer."""
+        sighting = self.detected_vehicles.pop(plate_number)
+        if sighting is not None:
+            self.persist_sighting(sighting)
 
-    def run_detection(self):
-        """
-        Capture video frames from USB camera and perform vehicle detection.
-        """
-        camera_index = 0
+    def persist_sighting(self, sighting: PlateSighting) -> None:
+        """Submit a finished sighting to the background writer"""
+        self.detection_writer.submit(DetectionRecord(
+            plate_number=sighting.plate_number,
+            vehicle_type=sighting.vehicle_type,
+            confidence=sighting.confidence,
+            frame=sighting.crop,
+            detection_time=datetime.fromtimestamp(sighting.timestamp)
+        ))
+
+    def on_detection_saved(self, plate_number: str, capture_path: str) -> None:
+        """Called by the background writer once a detection is committed"""
+        print(f"New plate {plate_number} added to detected_vehicles database - Turning on DB LED for 5 seconds")
+        self.turn_on_db_led(5.0)
+
+    def open_camera(self, camera_index: int = 0):
+        """Open the USB camera at the detection resolution"""
         cap = cv2.VideoCapture(camera_index)
 
         if not cap.isOpened():
@@ -374,25 +506,35 @@ class VehicleTracker:
 
         print(f"Actual FPS: {cap.get(cv2.CAP_PROP_FPS)}")
         print("USB Camera initialized successfully. Press 'q' to quit")
+        return cap
 
-        frame_count = 0
-        process_every_n_frames = 3
-        start_time = time.time()
+    def run_detection(self, pipelined: bool = False):
+        """
+        Capture video frames from USB camera and perform vehicle detection.
+        """
+        if pipelined:
+            self.run_pipelined_detection()
+            return
+
+        cap = self.open_camera()
+        self.scheduler.pipelined = False
+        last_report = time.time()
 
         while True:
             ret, frame = cap.read()
             if ret and frame is not None:
-                frame_count += 1
-                if frame_count % process_every_n_frames == 0:
-                    processed_frame = self.process_frame(frame)
-                    if frame_count % 30 == 0:
-                        elapsed = time.time() - start_time
-                        fps = (frame_count / process_every_n_frames) / elapsed
-                        print(f"FPS: {fps:.2f}")
-                        start_time = time.time()
-                        frame_count = 0
+                now = time.time()
+                processed_frame = frame
+                if not self.models.ready():
+                    self.hold_frame(FramePacket(0, frame, now))
                 else:
-                    processed_frame = frame
+                    self.process_held_frames()
+                    if self.admit_frame(now):
+                        processed_frame = self.process_frame(frame, now)
+                    self.finalize_tracks(now)
+                if now - last_report >= 10:
+                    print(f"Scheduler: {self.scheduler.metrics()}")
+                    last_report = now
                 cv2.imshow("Vehicle Detection", processed_frame)
                 if cv2.waitKey(1) & 0xFF == ord('q'):
                     break
@@ -403,20 +545,139 @@ class VehicleTracker:
         cap.release()
         cv2.destroyAllWindows()
         print("Resources released.")
-    
+
+    def run_pipelined_detection(self, queue_size: int = 2):
+        """
+        Run capture, vehicle detection, plate recognition and persistence on separate threads.
+
+        Stages are connected by bounded queues that drop the oldest frame when full,
+        so camera reads never wait on OCR or MySQL and throughput follows the slowest stage.
+        Display stays on the calling thread, as cv2.imshow requires.
+        """
+        cap = self.open_camera()
+        latest_result = {'packet': None}
+
+        def persist_stage(packet):
+            # Keep the newest finished packet so the display loop can overlay it
+            latest_result['packet'] = self.track_detection_stage(packet)
+            return None
+
+        # Capture time of every frame submitted that has not left the pipeline yet, by frame id
+        in_flight = {}
+        in_flight_lock = threading.Lock()
+
+        def leave(packet):
+            with in_flight_lock:
+                in_flight.pop(packet.frame_id, None)
+
+        def submit(packet):
+            with in_flight_lock:
+                in_flight[packet.frame_id] = packet.timestamp
+            return pipeline.submit(packet)
+
+        stages = self.detection_stages()
+        stages[-1] = ('persist', persist_stage)
+        self.scheduler.pipelined = True
+        pipeline = DetectionPipeline(stages, queue_size=queue_size, on_timing=self.record_stage, on_exit=leave)
+        for (name, _), stage_queue in zip(stages, pipeline.queues):
+            QUEUE_DEPTH.set_function(stage_queue.__len__, queue=name)
+        display_queue = DropOldestQueue(1)
+        stop_event = threading.Event()
+
+        first_queue = pipeline.queues[0]
+
+        def capture_loop():
+            frame_id = 0
+            try:
+                while not stop_event.is_set():
+                    ret, frame = cap.read()
+                    if not ret or frame is None:
+                        print("No frame captured or error reading frame.")
+                        break
+                    frame_id += 1
+                    now = time.time()
+                    packet = FramePacket(frame_id, frame, now)
+                    try:
+                        ready = self.models.ready()
+                    except RuntimeError as err:
+                        print(err)
+                        break
+                    if not ready:
+                        self.hold_frame(packet)
+                    else:
+                        if self.held_frames:
+                            feed_held_frames()
+                        if self.admit_frame(now) and submit(packet):
+                            FRAMES.labels(result='dropped').inc()
+                        # A frame still in flight may match a track yet, so tracks only expire up to
+                        # the oldest of them; the capture clock runs ahead of the stages by the queue lag
+                        with in_flight_lock:
+                            tracks_time = min(in_flight.values(), default=now)
+                        self.finalize_tracks(tracks_time)
+                    display_queue.put(frame)
+            finally:
+                display_queue.close()
+
+        def feed_held_frames():
+            # Frames held during model loading go in ahead of live ones, each once the first
+            # stage has room, so none of them are dropped
+            while self.held_frames and not stop_event.is_set():
+                if len(first_queue) < first_queue.maxsize:
+                    submit(self.held_frames.popleft())
+                else:
+                    time.sleep(0.01)
+
+        capture_thread = threading.Thread(target=capture_loop, name="stage-capture", daemon=True)
+        pipeline.start()
+        capture_thread.start()
+
+        last_report = time.time()
+        try:
+            while True:
+                frame = display_queue.get(timeout=1.0)
+                if frame is None:
+                    if display_queue.closed:
+                        break
+                    continue
+
+                packet = latest_result['packet']
+                if packet is not None and time.time() - packet.timestamp < 1.0:
+                    frame = self.annotate_frame(frame.copy(), packet)
+                cv2.imshow("Vehicle Detection", frame)
+                if cv2.waitKey(1) & 0xFF == ord('q'):
+                    break
+
+                if time.time() - last_report >= 10:
+                    print(f"Pipeline stats: {pipeline.stats()}")
+                    print(f"Scheduler: {self.scheduler.metrics()}")
+                    print(f"OCR: {self.ocr_report()}")
+                    last_report = time.time()
+        finally:
+            stop_event.set()
+            capture_thread.join(timeout=2.0)
+            pipeline.stop()
+            cap.release()
+            cv2.destroyAllWindows()
+            print("Resources released.")
+
     def _cleanup(self) -> None:
         """Clean up resources"""
-        if self.db_connection and self.db_cursor:
-            try:
-                self.db_cursor.close()
-                self.db_connection.close()
-                print("Database connection closed")
-            except mysql.connector.Error as e:
-                print(f"Error closing database connection: {e}")
-        GPIO.output(self.WHITELIST_LED_PIN, GPIO.LOW)
-        GPIO.output(self.DB_LED_PIN, GPIO.LOW)
-        GPIO.cleanup()
-        print("GPIO resources cleaned up")
+        if getattr(self, 'retention', None) is not None:
+            self.retention.stop()
+        if getattr(self, 'metrics_exporter', None) is not None:
+            self.metrics_exporter.stop()
+            self.metrics_exporter = None
+        if getattr(self, 'detection_writer', None) is not None:
+            # Persist the plates of open tracks and the sightings still held in memory before the writer drains
+            self.finalize_tracks(float('inf'))
+            self.detected_vehicles.stop()
+            self.detected_vehicles.evict(float('inf'))
+            self.detection_writer.stop()
+        if getattr(self, 'whitelist_cache', None) is not None:
+            self.whitelist_cache.stop()
+        if getattr(self, 'indicators', None) is not None:
+            self.indicators.close()
+            print("GPIO resources cleaned up")
 
     def __del__(self):
         """Destructor to ensure cleanup"""
@@ -424,25 +685,63 @@ class VehicleTracker:
 
 def main():
     """Main execution function"""
-    print("Starting Flask server...")
-    flask_process = subprocess.Popen(["python", "app.py"])
-    time.sleep(3)  # Give Flask server time to start
-    print("Flask app started successfully!")
-    
-    # Open the dashboard in the browser
-    open_dashboard()
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Automatic Number Plate Recognition")
+    parser.add_argument("--pipelined", action="store_true",
+                        help="run capture, detection, OCR and persistence on separate threads")
+    parser.add_argument("--storage", choices=["mysql", "sqlite"],
+                        help="storage backend, overrides ANPR_DB_BACKEND")
+    parser.add_argument("--multi-vehicle", action="store_true",
+                        help="read the plates of every vehicle in the frame, not only the most confident one")
+    parser.add_argument("--mode", choices=["vehicle-first", "plate-first"], default="vehicle-first",
+                        help="run the vehicle model on every frame, or only once a plate is found")
+    parser.add_argument("--embedded-dashboard", action="store_true",
+                        help="serve the dashboard from a thread of this process instead of a subprocess")
+    parser.add_argument("--roi", default=os.getenv('ANPR_ROI'),
+                        help="region of interest as x,y;x,y;... fractions of the frame, defaults to ANPR_ROI")
+    parser.add_argument("--motion-method", choices=["diff", "mog2"], default="diff",
+                        help="frame differencing or MOG2 background subtraction for the motion gate")
+    parser.add_argument("--no-motion-gate", action="store_true",
+                        help="run the models on every processed frame, even without motion")
+    args = parser.parse_args()
+    if args.storage:
+        # The dashboard subprocess reads its backend from the environment
+        os.environ['ANPR_DB_BACKEND'] = args.storage
+
+    storage = create_storage()
+    whitelist_cache = None
+    flask_process = None
+    dashboard_server = None
+
+    if args.embedded_dashboard:
+        # Serve the dashboard from this process, sharing storage and the whitelist cache
+        import app as dashboard
+        storage.setup()
+        whitelist_cache = WhitelistCache(storage)
+        whitelist_cache.start()
+        dashboard_server = dashboard.start_server(shared_storage=storage, shared_whitelist_cache=whitelist_cache)
+        dashboard_ready = True
+    else:
+        print("Starting Flask server...")
+        # The tracker exports its metrics to this file for the dashboard process to serve
+        os.environ.setdefault('ANPR_METRICS_FILE', os.path.join(tempfile.gettempdir(), "anpr_metrics.json"))
+        flask_process = subprocess.Popen([sys.executable, "app.py"])
+        dashboard_ready = wait_for_dashboard()
+
+    if dashboard_ready:
+        print("Flask app started successfully!")
+        # Open the dashboard in the browser
+        open_dashboard()
+    else:
+        print("Dashboard did not become ready, continuing without opening it")
 
     try:
-        db_config = {
-            'host': 'localhost',
-            'user': 'root',
-            'password': "priyanshu",
-            'database': 'vehicle_tracking'
-        }
-        
-        tracker = VehicleTracker(db_config=db_config)
+        motion_gate = None if args.no_motion_gate else MotionGate(roi=parse_roi(args.roi), method=args.motion_method)
+        tracker = VehicleTracker(storage=storage, whitelist_cache=whitelist_cache,
+                                 multi_vehicle=args.multi_vehicle, detection_mode=args.mode,
+                                 motion_gate=motion_gate)
         if tracker.test_database_connection():
-            tracker.run_detection()
+            tracker.run_detection(pipelined=args.pipelined)
         else:
             print("Skipping detection due to database connection failure")
     
@@ -451,9 +750,12 @@ def main():
 
     finally:
         print("Stopping Flask server...")
-        flask_process.terminate()
-        flask_process.wait()
+        if dashboard_server is not None:
+            dashboard_server.shutdown()
+        if flask_process is not None:
+            flask_process.terminate()
+            flask_process.wait()
         print("Flask app stopped.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,127 @@
+import argparse
+import json
+import os
+import resource
+import tempfile
+import time
+
+from main import VehicleTracker
+from src.indicators import MockGPIO
+from src.motion import MotionGate, parse_roi
+from src.pipeline import FramePacket
+from src.plate_utils import normalize_plate_number
+from src.replay import FramePacer, compare_plates, latency_summary, load_ground_truth, read_frames, source_fps
+from src.storage import SQLiteStorage
+
+
+def replay(tracker, pacer, frames, scheduled=False):
+    """
+    Run every stage of the tracker over the frames, headless
+
+    Args:
+        tracker (VehicleTracker): Tracker to drive
+        pacer (FramePacer): Supplies frame timestamps
+        frames (iterable): Frames in source order
+        scheduled (bool): Let the adaptive scheduler skip frames, as it would live
+
+    Returns:
+        dict: Frame counts, stage latency samples and plates found
+    """
+    samples = {name: [] for name, _ in tracker.detection_stages()}
+    plates = set()
+    captured = 0
+    processed = 0
+
+    start = time.perf_counter()
+    for frame_id, (timestamp, frame) in enumerate(pacer.pace(frames)):
+        captured += 1
+        # Tracks end when their vehicle leaves, whether or not later frames are processed
+        plates.update(normalize_plate_number(plate_number) for _, plate_number, _, _ in tracker.finalize_tracks(timestamp))
+        if scheduled and not tracker.admit_frame(timestamp):
+            continue
+        processed += 1
+        packet = tracker.process_packet(FramePacket(frame_id, frame, timestamp),
+                                        on_timing=lambda name, seconds: samples[name].append(seconds))
+        if packet is not None:
+            plates.update(normalize_plate_number(plate_number) for _, _, plate_number, _ in packet.plates)
+            plates.update(normalize_plate_number(plate_number) for _, plate_number, _, _ in packet.ended)
+    elapsed = time.perf_counter() - start
+
+    # Tracks still open at the end of the footage emit their consensus as well
+    plates.update(track.final_plate() for track in tracker.vehicle_tracks.tracks if track.final_plate())
+    return {
+        'captured': captured,
+        'processed': processed,
+        'seconds': elapsed,
+        'samples': samples,
+        'plates': plates
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded footage through the detection pipeline, headless")
+    parser.add_argument("source", help="recorded video file or directory of images")
+    parser.add_argument("--ground-truth", help="CSV file with a plate_number column")
+    parser.add_argument("--realtime", action="store_true",
+                        help="release frames at the source frame rate, dropping late ones, instead of flat out")
+    parser.add_argument("--fps", type=float, default=10.0, help="frame rate of image directories")
+    parser.add_argument("--scheduled", action="store_true", help="let the adaptive scheduler skip frames")
+    parser.add_argument("--mode", choices=["vehicle-first", "plate-first"], default="vehicle-first")
+    parser.add_argument("--multi-vehicle", action="store_true", help="read every vehicle in the frame")
+    parser.add_argument("--motion-gate", action="store_true", help="gate inference on motion")
+    parser.add_argument("--roi", help="region of interest for the motion gate, as x,y;x,y;... fractions")
+    parser.add_argument("--output", help="write the JSON report to this file as well")
+    args = parser.parse_args()
+
+    truth = load_ground_truth(args.ground_truth) if args.ground_truth else None
+    pacer = FramePacer(source_fps(args.source, args.fps), realtime=args.realtime)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        storage = SQLiteStorage(os.path.join(work_dir, "replay.db"))
+        tracker = VehicleTracker(
+            capture_folder=os.path.join(work_dir, "captures"),
+            storage=storage,
+            gpio=MockGPIO(),
+            multi_vehicle=args.multi_vehicle,
+            detection_mode=args.mode,
+            motion_gate=MotionGate(roi=parse_roi(args.roi)) if args.motion_gate else None
+        )
+        try:
+            # Replay from the first frame at steady-state speed; the cold start is reported separately
+            tracker.models.wait()
+            result = replay(tracker, pacer, read_frames(args.source), scheduled=args.scheduled)
+        finally:
+            # Flushes the buffered sightings through the writer before the database is read back
+            tracker._cleanup()
+        persisted = len(storage.recent_detections())
+
+    vehicles = tracker.vehicle_tracks.created
+    report = {
+        'frames': {
+            'captured': result['captured'],
+            'processed': result['processed'],
+            'dropped_late': pacer.dropped
+        },
+        'startup': tracker.models.timings,
+        'seconds': round(result['seconds'], 3),
+        'throughput_fps': round(result['captured'] / result['seconds'], 2) if result['seconds'] else 0.0,
+        'stages': latency_summary(result['samples']),
+        'ocr': dict(tracker.ocr_report(), vehicles=vehicles,
+                    calls_per_vehicle=round(tracker.ocr_calls / vehicles, 2) if vehicles else None),
+        # ru_maxrss is in kilobytes on Linux
+        'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'plates': sorted(result['plates']),
+        'persisted_detections': persisted
+    }
+    if truth:
+        report['ground_truth'] = compare_plates(result['plates'], truth)
+
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,35 @@
-from ultralytics import YOLO
 import cv2
+import numpy as np
+
+from src.detections import Detections
+from src.inference import create_runner
+from src.metrics import INFERENCE_SECONDS
 
 class VehicleDetector:
-    def __init__(self, model_path='models/best_float16.tflite'):
+    def __init__(self, model_path='models/best_float16.tflite', backend=None, num_threads=None):
         """
         Initialize Vehicle Detector with YOLOv8 model
         
         Args:
             model_path (str): Path to pre-trained YOLOv8 model
+            backend (str): "ultralytics" or "lean", defaults to ANPR_INFERENCE_BACKEND
+            num_threads (int): Inference threads of the lean backend
         """
-        self.model = YOLO(model_path, task='detect')
+        self.model = create_runner(model_path, backend=backend, num_threads=num_threads)
         self.class_names = ["2-wheeler", "3-wheeler", "HMV", "LMV"]
     
+    def warm_up(self, frame_shape=(240, 320, 3), runs=2):
+        """
+        Run inference on blank frames so the first real frame is not slowed by lazy initialization
+
+        Args:
+            frame_shape (tuple): Shape of the camera frames
+            runs (int): Number of warm-up inferences
+        """
+        frame = np.zeros(frame_shape, dtype=np.uint8)
+        for _ in range(runs):
+            self.model.predict(frame)
+
     def detect(self, frame):
         """
         Detect vehicles in the input frame
@@ -20,43 +38,23 @@ class VehicleDetector:
             frame (numpy.ndarray): Input image/frame
         
         Returns:
-            list: Detected vehicle information [x1, y1, x2, y2, vehicle_type]
+            Detections: Vehicles above 0.5 confidence, labelled with their vehicle type
         """
         # Ensure frame is not empty
         if frame is None:
-            return []
+            return Detections(class_names=self.class_names)
         
         try:
             # Run inference
-            results = self.model(frame)[0]
-            detections = []
-            
-            # Process each detection
-            for box in results.boxes:
-                # Extract bounding box coordinates
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                
-                # Get confidence score
-                conf = float(box.conf[0])
-                
-                # Get class ID
-                class_id = int(box.cls[0])
-                
-                # Filter detections by confidence
-                if conf > 0.5:
-                    # Get vehicle type
-                    vehicle_type = (self.class_names[class_id] 
-                                    if class_id < len(self.class_names) 
-                                    else "Unknown")
-                    
-                    # Add detection to list
-                    detections.append([x1, y1, x2, y2, vehicle_type, conf])
+            with INFERENCE_SECONDS.labels(model='vehicle').time():
+                detections = self.model.predict(frame)
             
-            return detections
+            # Filter detections by confidence
+            return Detections.from_array(detections, self.class_names).above(0.5)
         
         except Exception as e:
             print(f"Error in vehicle detection: {e}")
-            return []
+            return Detections(class_names=self.class_names)
     
     def draw_detections(self, frame, detections):
         """
@@ -64,7 +62,7 @@ class VehicleDetector:
         
         Args:
             frame (numpy.ndarray): Input image/frame
-            detections (list): List of detections
+            detections (Detections): Vehicles to draw
         
         Returns:
             numpy.ndarray: Frame with detections drawn
@@ -73,13 +71,13 @@ class VehicleDetector:
         output = frame.copy()
         
         for detection in detections:
-            x1, y1, x2, y2, vehicle_type, conf = detection
+            x1, y1, x2, y2 = detection.box
             
             # Draw bounding box
             cv2.rectangle(output, (x1, y1), (x2, y2), (0, 255, 0), 2)
             
             # Draw label
-            label = f"{vehicle_type} {conf:.2f}"
+            label = f"{detection.label} {detection.confidence:.2f}"
             cv2.putText(output, label, (x1, y1-10), 
                         cv2.FONT_HERSHEY_SIMPLEX, 0.9, 
                         (0, 255, 0), 2)
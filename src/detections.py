@@ -0,0 +1,107 @@
+import numpy as np
+
+# One row per detected box, in image pixels
+DETECTION_DTYPE = np.dtype([
+    ('box', np.int32, (4,)),
+    ('confidence', np.float32),
+    ('class_id', np.int32)
+])
+
+
+class Detection:
+    __slots__ = ('box', 'confidence', 'class_id', 'label')
+
+    def __init__(self, box, confidence, class_id=-1, label=None):
+        """
+        A single detection taken out of a Detections batch
+
+        Args:
+            box (tuple): x1, y1, x2, y2 in image pixels
+            confidence (float): Model confidence
+            class_id (int): Model class id, -1 if not from a model
+            label (str): Class name, None for single-class models
+        """
+        self.box = box
+        self.confidence = confidence
+        self.class_id = class_id
+        self.label = label
+
+
+class Detections:
+    __slots__ = ('data', 'class_names')
+
+    def __init__(self, data=None, class_names=()):
+        """
+        Detections of one image held in a NumPy structured array
+
+        Filtering, sorting and shifting work on the whole array at once;
+        Detection objects are only created for the boxes a caller iterates
+        over, usually the few kept after filtering.
+
+        Args:
+            data (numpy.ndarray): Array of DETECTION_DTYPE, empty if None
+            class_names (tuple): Class name per class id
+        """
+        self.data = np.zeros(0, dtype=DETECTION_DTYPE) if data is None else data
+        self.class_names = tuple(class_names)
+
+    @classmethod
+    def from_array(cls, array, class_names=()):
+        """
+        Detections from an (n, 6) array of x1, y1, x2, y2, confidence, class id
+
+        Box coordinates are truncated to whole pixels.
+        """
+        data = np.empty(len(array), dtype=DETECTION_DTYPE)
+        data['box'] = array[:, :4]
+        data['confidence'] = array[:, 4]
+        data['class_id'] = array[:, 5]
+        return cls(data, class_names)
+
+    def _with(self, data):
+        return Detections(data, self.class_names)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __iter__(self):
+        columns = (self.data['box'].tolist(), self.data['confidence'].tolist(), self.data['class_id'].tolist())
+        for box, confidence, class_id, label in zip(*columns, self.labels()):
+            yield Detection(tuple(box), confidence, class_id, label)
+
+    def labels(self):
+        """Class name of every detection, "Unknown" for ids outside class_names, None without names"""
+        if not self.class_names:
+            return [None] * len(self.data)
+        names = np.asarray(self.class_names + ("Unknown",), dtype=object)
+        class_ids = self.data['class_id']
+        known = (class_ids >= 0) & (class_ids < len(self.class_names))
+        return names[np.where(known, class_ids, len(self.class_names))].tolist()
+
+    def above(self, threshold):
+        """Detections with a confidence above the threshold"""
+        return self._with(self.data[self.data['confidence'] > threshold])
+
+    def top(self, k=None):
+        """The k most confident detections, most confident first; all of them sorted if k is None"""
+        order = np.argsort(-self.data['confidence'], kind='stable')
+        return self._with(self.data[order[:k]])
+
+    def shifted(self, offset_x, offset_y):
+        """Detections moved by an offset, e.g. from a crop back into the full frame"""
+        if not offset_x and not offset_y:
+            return self
+        data = self.data.copy()
+        data['box'] += (offset_x, offset_y, offset_x, offset_y)
+        return self._with(data)
+
+    def containing(self, x, y):
+        """Detections whose box contains the point"""
+        x1, y1, x2, y2 = self.data['box'].T
+        return self._with(self.data[(x1 <= x) & (x <= x2) & (y1 <= y) & (y <= y2)])
+
+    def best(self):
+        """Most confident detection, or None if there are none"""
+        if not len(self.data):
+            return None
+        return next(iter(self._with(self.data[[np.argmax(self.data['confidence'])]])))
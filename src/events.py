@@ -0,0 +1,106 @@
+import threading
+from datetime import datetime, timedelta
+
+from src.pipeline import DropOldestQueue
+from src.storage import StorageError
+
+
+class EventBus:
+    def __init__(self, queue_size=100):
+        """
+        Fan-out of events to any number of subscribers
+
+        Every subscriber gets its own bounded queue, so a slow client loses its
+        oldest events instead of holding up the publisher or other clients.
+
+        Args:
+            queue_size (int): Events buffered per subscriber
+        """
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """
+        Register a new subscriber
+
+        Returns:
+            DropOldestQueue: Queue receiving the published events
+        """
+        subscription = DropOldestQueue(self.queue_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+        subscription.close()
+
+    def publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put(event)
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+class DetectionTailer(threading.Thread):
+    def __init__(self, storage, event_bus, interval=0.5, overlap=5.0):
+        """
+        Publish detections as they are written by a tracker in another process
+
+        Polls for rows written at or after the newest write seen, by the
+        updated_at time the upsert stamps on every row, and only while someone
+        is subscribed. Rows are re-read over a short overlap window, since the
+        stored time has whole-second resolution and a write can commit a
+        little after it was stamped, and rows already published are skipped.
+
+        Args:
+            storage (Storage): Storage backend to read from
+            event_bus (EventBus): Bus the new detections are published on
+            interval (float): Seconds between polls
+            overlap (float): Seconds re-read before the newest write seen
+        """
+        super().__init__(name="detection-tailer", daemon=True)
+        self.storage = storage
+        self.event_bus = event_bus
+        self.interval = interval
+        self.overlap = timedelta(seconds=overlap)
+        self._last_time = datetime.now()
+        self._seen = {}
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            if not self.event_bus.subscriber_count:
+                # Nobody is listening; skip ahead so a new client only gets fresh detections
+                self._last_time = datetime.now()
+                continue
+            self.poll()
+
+    def poll(self):
+        since = self._last_time - self.overlap
+        try:
+            rows = self.storage.detections_since(since)
+        except StorageError as err:
+            print(f"Error reading new detections: {err}")
+            return
+
+        for row in rows:
+            # Whole row, so an update stamped in the same second as the last write still counts as new
+            key = tuple(row.values())
+            if key in self._seen:
+                continue
+            self._seen[key] = row['updated_at']
+            self._last_time = max(self._last_time, row['updated_at'])
+            self.event_bus.publish(row)
+
+        self._seen = {key: seen for key, seen in self._seen.items() if seen >= since}
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,181 @@
+import hashlib
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from src.metrics import IMAGE_WRITE_SECONDS
+
+
+class ImageStore:
+    # Per-day file holding the bytes written to that day's directory
+    usage_file = ".bytes"
+
+    def __init__(self, root, jpeg_quality=85, thumbnail_width=160, thumbnail_quality=70, workers=2):
+        """
+        Capture images written by a thread pool under content-addressed, sharded paths
+
+        Each image is stored as root/YYYY/MM/DD/<2 hex>/<plate>_<hash>.jpg, where
+        the hash is taken from the encoded JPEG. Names never collide, no
+        directory holds more than a fraction of a day's captures, and old days
+        can be dropped a directory at a time. The store counts the bytes it
+        writes and deletes per day directory in memory, so the size of a day
+        is known without listing its files; save_usage writes the totals to a
+        small file per day, from the retention sweep and at shutdown, so
+        captures cost no extra writes.
+
+        Args:
+            root (str): Base folder of the captures
+            jpeg_quality (int): JPEG quality of the capture, 0-100
+            thumbnail_width (int): Width of the thumbnail in pixels
+            thumbnail_quality (int): JPEG quality of the thumbnail, 0-100
+            workers (int): Threads encoding and writing images
+        """
+        self.root = root
+        self.jpeg_quality = jpeg_quality
+        self.thumbnail_width = thumbnail_width
+        self.thumbnail_quality = thumbnail_quality
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-store")
+        self._day_bytes = {}
+        # Day directories whose total changed since it was last saved
+        self._unsaved_days = set()
+        self._usage_lock = threading.Lock()
+
+    def save(self, plate_number, detection_time, image):
+        """
+        Queue a capture and its thumbnail for writing
+
+        Args:
+            plate_number (str): Normalized plate number, used in the file name
+            detection_time (datetime): Time of the detection, selects the date directory
+            image (numpy.ndarray): Vehicle crop to store
+
+        Returns:
+            concurrent.futures.Future: Resolves to (image path, thumbnail path)
+        """
+        return self._executor.submit(self._save, plate_number, detection_time, image)
+
+    def _save(self, plate_number, detection_time, image):
+        with IMAGE_WRITE_SECONDS.time():
+            return self._store(plate_number, detection_time, image)
+
+    def _store(self, plate_number, detection_time, image):
+        data = self.encode(image, self.jpeg_quality)
+        digest = hashlib.sha1(data).hexdigest()
+        day_directory = os.path.join(self.root, detection_time.strftime("%Y"), detection_time.strftime("%m"),
+                                     detection_time.strftime("%d"))
+        directory = os.path.join(day_directory, digest[:2])
+        os.makedirs(directory, exist_ok=True)
+        # Load or measure the day's total before adding to it, so this write is never counted twice
+        self.day_bytes(day_directory)
+
+        image_path = os.path.join(directory, f"{plate_number}_{digest[:12]}.jpg")
+        thumbnail_path = os.path.join(directory, f"{plate_number}_{digest[:12]}_thumb.jpg")
+        self._write(image_path, data)
+
+        height, width = image.shape[:2]
+        if width > self.thumbnail_width:
+            size = (self.thumbnail_width, max(1, round(height * self.thumbnail_width / width)))
+            image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+        thumbnail = self.encode(image, self.thumbnail_quality)
+        self._write(thumbnail_path, thumbnail)
+        self._add_usage(day_directory, len(data) + len(thumbnail))
+        return image_path, thumbnail_path
+
+    @staticmethod
+    def encode(image, quality):
+        ok, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if not ok:
+            raise ValueError("Could not encode image as JPEG")
+        return buffer.tobytes()
+
+    @staticmethod
+    def _write(path, data):
+        # Write under a temporary name so a crash never leaves a truncated JPEG behind
+        temporary_path = path + ".tmp"
+        with open(temporary_path, "wb") as f:
+            f.write(data)
+        os.replace(temporary_path, path)
+
+    def delete(self, paths):
+        """Remove stored files, ignoring ones that are already gone"""
+        for path in paths:
+            if not path:
+                continue
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            day_directory = os.path.dirname(os.path.dirname(path))
+            if self._is_day_directory(day_directory):
+                self._add_usage(day_directory, -size)
+
+    def day_bytes(self, day_directory):
+        """
+        Bytes stored in a day directory, from the kept total
+
+        Days without a saved total, e.g. written before the store kept
+        totals, are measured once.
+        """
+        with self._usage_lock:
+            return self._usage(day_directory)
+
+    def remove_day(self, day_directory):
+        """Delete a whole day directory and its byte total"""
+        with self._usage_lock:
+            shutil.rmtree(day_directory, ignore_errors=True)
+            self._day_bytes.pop(day_directory, None)
+            self._unsaved_days.discard(day_directory)
+
+    def save_usage(self):
+        """Write the byte totals that changed since the last call to their day directories"""
+        with self._usage_lock:
+            days = [(day, self._day_bytes[day]) for day in self._unsaved_days if os.path.isdir(day)]
+            self._unsaved_days.clear()
+        for day_directory, total in days:
+            try:
+                self._write(os.path.join(day_directory, self.usage_file), str(total).encode())
+            except OSError as err:
+                print(f"Error saving capture usage of {day_directory}: {err}")
+
+    def _is_day_directory(self, path):
+        parts = os.path.relpath(path, self.root).split(os.sep)
+        return len(parts) == 3 and all(part.isdigit() for part in parts)
+
+    def _add_usage(self, day_directory, amount):
+        with self._usage_lock:
+            self._day_bytes[day_directory] = max(0, self._usage(day_directory) + amount)
+            self._unsaved_days.add(day_directory)
+
+    def _usage(self, day_directory):
+        # Called with _usage_lock held
+        if day_directory in self._day_bytes:
+            return self._day_bytes[day_directory]
+        try:
+            with open(os.path.join(day_directory, self.usage_file)) as f:
+                total = int(f.read())
+        except (OSError, ValueError):
+            total = self._measure(day_directory)
+            self._unsaved_days.add(day_directory)
+        self._day_bytes[day_directory] = total
+        return total
+
+    def _measure(self, day_directory):
+        size = 0
+        for directory, _, files in os.walk(day_directory):
+            for name in files:
+                if name == self.usage_file:
+                    continue
+                try:
+                    size += os.path.getsize(os.path.join(directory, name))
+                except OSError:
+                    continue
+        return size
+
+    def shutdown(self):
+        """Finish the queued writes, stop the worker threads and save the byte totals"""
+        self._executor.shutdown(wait=True)
+        self.save_usage()
@@ -0,0 +1,45 @@
+import cv2
+import numpy as np
+
+
+def letterbox(image, size, color=(114, 114, 114)):
+    """
+    Resize an image to fit a square canvas, keeping its aspect ratio
+
+    Args:
+        image (numpy.ndarray): Input image
+        size (int): Side of the output canvas in pixels
+        color (tuple): Padding colour
+
+    Returns:
+        tuple: (padded image, scale, (pad_x, pad_y)) needed to map boxes back
+    """
+    height, width = image.shape[:2]
+    scale = min(size / height, size / width)
+    new_width, new_height = max(1, round(width * scale)), max(1, round(height * scale))
+    resized = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_LINEAR)
+
+    pad_x = (size - new_width) // 2
+    pad_y = (size - new_height) // 2
+    canvas = np.full((size, size) + image.shape[2:], color[0] if image.ndim == 2 else color, dtype=image.dtype)
+    canvas[pad_y:pad_y + new_height, pad_x:pad_x + new_width] = resized
+    return canvas, scale, (pad_x, pad_y)
+
+
+def unletterbox_boxes(boxes, scale, padding, shape):
+    """
+    Map boxes from letterboxed coordinates back to the original image
+
+    Args:
+        boxes (numpy.ndarray): (n, 4) boxes as x1, y1, x2, y2 in the letterboxed image
+        scale (float): Scale returned by letterbox
+        padding (tuple): (pad_x, pad_y) returned by letterbox
+        shape (tuple): Shape of the original image
+
+    Returns:
+        numpy.ndarray: (n, 4) boxes clipped to the original image
+    """
+    pad_x, pad_y = padding
+    height, width = shape[:2]
+    boxes = (boxes - (pad_x, pad_y, pad_x, pad_y)) / scale
+    return np.clip(boxes, 0, (width, height, width, height))
@@ -0,0 +1,131 @@
+import heapq
+import threading
+import time
+
+try:
+    import RPi.GPIO as GPIO
+except (ImportError, RuntimeError):
+    GPIO = None
+
+
+class MockGPIO:
+    """Stand-in for RPi.GPIO that records pin states instead of driving hardware."""
+    BCM = "BCM"
+    OUT = "OUT"
+    HIGH = 1
+    LOW = 0
+
+    def __init__(self):
+        self.states = {}
+        self.history = []
+
+    def setmode(self, mode):
+        pass
+
+    def setwarnings(self, flag):
+        pass
+
+    def setup(self, pin, mode):
+        self.states[pin] = self.LOW
+
+    def output(self, pin, value):
+        self.states[pin] = value
+        self.history.append((time.monotonic(), pin, value))
+
+    def cleanup(self):
+        self.states.clear()
+
+
+class LEDIndicator:
+    def __init__(self, pins, gpio=None):
+        """
+        Drive status LEDs from a background scheduler thread
+
+        pulse() only records a deadline and returns immediately, so the
+        detection loop is never blocked while an LED is lit.
+
+        Args:
+            pins (list): BCM pin numbers to configure as outputs
+            gpio: GPIO backend, defaults to RPi.GPIO or MockGPIO off the Pi
+        """
+        if gpio is None:
+            if GPIO is None:
+                print("RPi.GPIO not available, using mock GPIO backend")
+                gpio = MockGPIO()
+            else:
+                gpio = GPIO
+        self.gpio = gpio
+        self.pins = list(pins)
+
+        self.gpio.setmode(self.gpio.BCM)
+        self.gpio.setwarnings(False)
+        for pin in self.pins:
+            self.gpio.setup(pin, self.gpio.OUT)
+            self.gpio.output(pin, self.gpio.LOW)
+
+        self._deadlines = {}
+        self._heap = []
+        self._condition = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="led-scheduler", daemon=True)
+        self._thread.start()
+
+    def pulse(self, pin, duration=5.0):
+        """
+        Turn a pin on for the given duration without blocking
+
+        A pulse that overlaps one already running on the same pin extends it
+        instead of toggling the LED off and on again.
+
+        Args:
+            pin (int): BCM pin number
+            duration (float): Seconds the pin stays high
+        """
+        deadline = time.monotonic() + duration
+        with self._condition:
+            if not self._running:
+                return
+            current = self._deadlines.get(pin)
+            if current is None:
+                self.gpio.output(pin, self.gpio.HIGH)
+            if current is None or deadline > current:
+                self._deadlines[pin] = deadline
+                heapq.heappush(self._heap, (deadline, pin))
+                self._condition.notify()
+
+    def is_on(self, pin):
+        with self._condition:
+            return pin in self._deadlines
+
+    def _run(self):
+        with self._condition:
+            while self._running:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+
+                deadline, pin = self._heap[0]
+                remaining = deadline - time.monotonic()
+                if remaining > 0:
+                    self._condition.wait(remaining)
+                    continue
+
+                heapq.heappop(self._heap)
+                # Stale heap entries belong to pulses that were since extended
+                if self._deadlines.get(pin) == deadline:
+                    del self._deadlines[pin]
+                    self.gpio.output(pin, self.gpio.LOW)
+
+    def close(self):
+        """Stop the scheduler, switch all LEDs off and release the GPIO pins"""
+        with self._condition:
+            if not self._running:
+                return
+            self._running = False
+            self._deadlines.clear()
+            self._heap.clear()
+            self._condition.notify_all()
+        self._thread.join(timeout=1.0)
+        for pin in self.pins:
+            self.gpio.output(pin, self.gpio.LOW)
+        self.gpio.cleanup()
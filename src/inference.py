@@ -0,0 +1,268 @@
+import os
+
+import numpy as np
+
+from src.image_utils import letterbox, unletterbox_boxes
+
+
+def non_max_suppression(boxes, scores, iou_threshold=0.45):
+    """
+    Greedy non-maximum suppression
+
+    Args:
+        boxes (numpy.ndarray): (n, 4) boxes as x1, y1, x2, y2
+        scores (numpy.ndarray): (n,) box scores
+        iou_threshold (float): Overlap above which the lower-scoring box is removed
+
+    Returns:
+        numpy.ndarray: Indices of the kept boxes, highest score first
+    """
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    order = np.argsort(scores)[::-1]
+    keep = []
+    while order.size:
+        best = order[0]
+        keep.append(best)
+        rest = order[1:]
+        width = np.clip(np.minimum(x2[best], x2[rest]) - np.maximum(x1[best], x1[rest]), 0, None)
+        height = np.clip(np.minimum(y2[best], y2[rest]) - np.maximum(y1[best], y1[rest]), 0, None)
+        overlap = width * height
+        iou = overlap / (areas[best] + areas[rest] - overlap + 1e-9)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.intp)
+
+
+def decode_yolo(output, conf_threshold=0.25, iou_threshold=0.45):
+    """
+    Detections from a raw YOLOv8 detection head
+
+    Args:
+        output (numpy.ndarray): (4 + classes, anchors) predictions, boxes as centre x, centre y, width, height
+        conf_threshold (float): Minimum class score kept
+        iou_threshold (float): Overlap threshold of the per-class NMS
+
+    Returns:
+        numpy.ndarray: (n, 6) float32 rows of x1, y1, x2, y2, confidence, class id
+    """
+    predictions = output.T
+    class_scores = predictions[:, 4:]
+    class_ids = class_scores.argmax(axis=1)
+    scores = class_scores[np.arange(len(class_scores)), class_ids]
+    mask = scores > conf_threshold
+    if not mask.any():
+        return np.zeros((0, 6), dtype=np.float32)
+
+    centre_x, centre_y, width, height = predictions[mask, :4].T
+    boxes = np.stack([centre_x - width / 2, centre_y - height / 2, centre_x + width / 2, centre_y + height / 2], axis=1)
+    scores = scores[mask]
+    class_ids = class_ids[mask]
+
+    # Offset each class into its own range so one NMS pass never suppresses across classes
+    offsets = class_ids[:, None] * (boxes.max() + 1)
+    keep = non_max_suppression(boxes + offsets, scores, iou_threshold)
+    return np.column_stack([boxes[keep], scores[keep], class_ids[keep]]).astype(np.float32)
+
+
+class LeanYoloRunner:
+    def __init__(self, model_path, num_threads=None, conf_threshold=0.25, iou_threshold=0.45):
+        """
+        YOLOv8 detection model run directly by the TFLite interpreter or ONNX Runtime
+
+        Skips the Ultralytics wrapper: images are letterboxed with OpenCV and
+        NumPy, the raw head is decoded and suppressed in NumPy, and detections
+        come back as one array instead of per-box result objects. .tflite files
+        use tflite_runtime, or TensorFlow's interpreter if that is what is
+        installed; .onnx files use onnxruntime.
+
+        Args:
+            model_path (str): .tflite or .onnx YOLOv8 detection model
+            num_threads (int): Inference threads, None for the runtime default
+            conf_threshold (float): Minimum class score kept before NMS
+            iou_threshold (float): Overlap threshold of the NMS
+        """
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+        if model_path.endswith(".onnx"):
+            self._load_onnx(model_path, num_threads)
+        else:
+            self._load_tflite(model_path, num_threads)
+
+    def _load_tflite(self, model_path, num_threads):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            try:
+                from tensorflow.lite import Interpreter
+            except ImportError as err:
+                raise ImportError("The lean TFLite backend needs tflite-runtime or tensorflow") from err
+
+        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        # NHWC input; Ultralytics TFLite exports give boxes as fractions of the input size
+        _, self.input_height, self.input_width, _ = self._input['shape']
+        self.channels_first = False
+        self.normalized_boxes = True
+        self.max_batch = 1
+        self._invoke = self._invoke_tflite
+
+    def _load_onnx(self, model_path, num_threads):
+        try:
+            import onnxruntime
+        except ImportError as err:
+            raise ImportError("The lean ONNX backend needs onnxruntime") from err
+
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self._input_name = model_input.name
+        batch, _, self.input_height, self.input_width = model_input.shape
+        self.channels_first = True
+        self.normalized_boxes = False
+        # Models exported with dynamic=True take any batch size
+        self.max_batch = batch if isinstance(batch, int) else None
+        self._invoke = self._invoke_onnx
+
+    def _invoke_tflite(self, batch):
+        tensor = batch
+        scale, zero_point = self._input['quantization']
+        if self._input['dtype'] != np.float32 and scale:
+            tensor = (batch / scale + zero_point).astype(self._input['dtype'])
+        self.interpreter.set_tensor(self._input['index'], tensor)
+        self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self._output['index'])
+        scale, zero_point = self._output['quantization']
+        if output.dtype != np.float32 and scale:
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+    def _invoke_onnx(self, batch):
+        return self.session.run(None, {self._input_name: batch})[0]
+
+    def preprocess(self, image):
+        """Letterboxed RGB float tensor of one BGR image, with the scale and padding to undo it"""
+        # Ultralytics exports square inputs
+        canvas, scale, padding = letterbox(image, self.input_width)
+        tensor = canvas[..., ::-1].astype(np.float32) / 255.0
+        if self.channels_first:
+            tensor = tensor.transpose(2, 0, 1)
+        return tensor, scale, padding
+
+    def predict(self, image):
+        """
+        Detections in one BGR image
+
+        Returns:
+            numpy.ndarray: (n, 6) rows of x1, y1, x2, y2, confidence, class id in image pixels
+        """
+        return self.predict_batch([image])[0]
+
+    def predict_batch(self, images):
+        """
+        Detections in several BGR images, batched where the model allows it
+
+        Returns:
+            list: One (n, 6) array per image
+        """
+        prepared = [self.preprocess(image) for image in images]
+        step = self.max_batch or len(prepared) or 1
+        outputs = []
+        for offset in range(0, len(prepared), step):
+            batch = np.ascontiguousarray(np.stack([tensor for tensor, _, _ in prepared[offset:offset + step]]))
+            outputs.extend(self._invoke(batch))
+
+        detections = []
+        for image, (_, scale, padding), output in zip(images, prepared, outputs):
+            output = np.array(output, dtype=np.float32)
+            if self.normalized_boxes:
+                output[[0, 2]] *= self.input_width
+                output[[1, 3]] *= self.input_height
+            found = decode_yolo(output, self.conf_threshold, self.iou_threshold)
+            found[:, :4] = unletterbox_boxes(found[:, :4], scale, padding, image.shape)
+            detections.append(found)
+        return detections
+
+
+class UltralyticsRunner:
+    def __init__(self, model_path, input_size=None):
+        """
+        YOLO model run through the Ultralytics wrapper
+
+        Args:
+            model_path (str): Any model format Ultralytics loads
+            input_size (int): Square size images are letterboxed to for batched calls
+        """
+        from ultralytics import YOLO
+
+        self.model = YOLO(model_path, task='detect')
+        self.input_size = input_size
+        self.supports_batch = True
+
+    def predict(self, image):
+        """
+        Detections in one BGR image
+
+        Returns:
+            numpy.ndarray: (n, 6) rows of x1, y1, x2, y2, confidence, class id in image pixels
+        """
+        return self.model(image)[0].boxes.data.cpu().numpy().astype(np.float32)
+
+    def predict_batch(self, images):
+        """
+        Detections in several BGR images with one model invocation
+
+        Every image is letterboxed to the same square input size so they can
+        be stacked into one batch; boxes are mapped back to each image.
+        Models exported with a fixed batch size of one fall back to one call
+        per image.
+
+        Returns:
+            list: One (n, 6) array per image
+        """
+        letterboxed = [letterbox(image, self.input_size) for image in images]
+        batch = [image for image, _, _ in letterboxed]
+        if self.supports_batch:
+            try:
+                results = self.model(batch, imgsz=self.input_size)
+            except Exception as e:
+                print(f"Batched detection not supported by model, using single calls: {e}")
+                self.supports_batch = False
+        if not self.supports_batch:
+            results = [self.model(image, imgsz=self.input_size)[0] for image in batch]
+
+        detections = []
+        for image, (_, scale, padding), result in zip(images, letterboxed, results):
+            found = result.boxes.data.cpu().numpy().astype(np.float32)
+            found[:, :4] = unletterbox_boxes(found[:, :4], scale, padding, image.shape)
+            detections.append(found)
+        return detections
+
+
+def create_runner(model_path, input_size=None, backend=None, num_threads=None):
+    """
+    Build the inference backend selected by the environment
+
+    ANPR_INFERENCE_BACKEND chooses "ultralytics" (default) or "lean", the
+    direct TFLite/ONNX Runtime path. ANPR_INFERENCE_THREADS sets the thread
+    count of the lean backend.
+
+    Args:
+        model_path (str): Detection model file
+        input_size (int): Square size images are letterboxed to for batched Ultralytics calls
+        backend (str): Overrides ANPR_INFERENCE_BACKEND
+        num_threads (int): Overrides ANPR_INFERENCE_THREADS
+
+    Returns:
+        LeanYoloRunner or UltralyticsRunner: Object with predict and predict_batch
+    """
+    backend = (backend or os.getenv('ANPR_INFERENCE_BACKEND', 'ultralytics')).lower()
+    if backend == 'lean':
+        threads = num_threads or os.getenv('ANPR_INFERENCE_THREADS')
+        return LeanYoloRunner(model_path, num_threads=int(threads) if threads else None)
+    if backend == 'ultralytics':
+        return UltralyticsRunner(model_path, input_size)
+    raise ValueError(f"Unknown inference backend: {backend}")
@@ -0,0 +1,317 @@
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Metric(ABC):
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels):
+        """Child bound to one combination of label values"""
+        return _Child(self, tuple(str(labels[name]) for name in self.labelnames))
+
+    @abstractmethod
+    def _samples(self):
+        """Samples of every label combination, called with the lock held"""
+
+    def collect(self):
+        """Family of this metric as a JSON-serializable dict"""
+        with self._lock:
+            samples = self._samples()
+        return {'name': self.name, 'type': self.kind, 'help': self.documentation,
+                'labelnames': list(self.labelnames), 'samples': samples}
+
+
+class _Child:
+    __slots__ = ('metric', 'key')
+
+    def __init__(self, metric, key):
+        self.metric = metric
+        self.key = key
+
+    def inc(self, amount=1.0):
+        self.metric._inc(self.key, amount)
+
+    def set(self, value):
+        self.metric._set(self.key, value)
+
+    def observe(self, value):
+        self.metric._observe(self.key, value)
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1.0):
+        self._inc((), amount)
+
+    def _inc(self, key, amount):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self):
+        return [{'labels': list(key), 'value': value} for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._functions = {}
+
+    def set(self, value):
+        self._set((), value)
+
+    def _set(self, key, value):
+        with self._lock:
+            self._values[key] = float(value)
+
+    def _inc(self, key, amount):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_function(self, function, **labels):
+        """Read the value from a callable when the metric is collected, e.g. a queue length"""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._functions[key] = function
+
+    def _samples(self):
+        values = dict(self._values)
+        for key, function in self._functions.items():
+            try:
+                values[key] = float(function())
+            except Exception:
+                continue
+        return [{'labels': list(key), 'value': value} for key, value in values.items()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value):
+        self._observe((), value)
+
+    def time(self):
+        return _Child(self, ()).time()
+
+    def _observe(self, key, value):
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry['counts'][index] += 1
+                    break
+            entry['sum'] += value
+            entry['count'] += 1
+
+    def _samples(self):
+        samples = []
+        for key, entry in self._values.items():
+            cumulative = []
+            total = 0
+            for count in entry['counts']:
+                total += count
+                cumulative.append(total)
+            samples.append({'labels': list(key), 'buckets': list(self.buckets), 'cumulative': cumulative,
+                            'sum': entry['sum'], 'count': entry['count']})
+        return samples
+
+
+class Registry:
+    def __init__(self):
+        """Collection of metrics rendered together"""
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, *args, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def snapshot(self):
+        """
+        Current value of every metric
+
+        Returns:
+            list: One JSON-serializable dict per metric family
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return [metric.collect() for metric in metrics]
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render_prometheus(families):
+    """
+    Prometheus text exposition of a snapshot
+
+    Args:
+        families (list): Output of Registry.snapshot
+
+    Returns:
+        str: Metrics in the text format served on /metrics
+    """
+    lines = []
+    for family in families:
+        name = family['name']
+        names = family['labelnames']
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for sample in family['samples']:
+            values = sample['labels']
+            if family['type'] != "histogram":
+                lines.append(f"{name}{_format_labels(names, values)} {_format_value(sample['value'])}")
+                continue
+            for bound, count in zip(sample['buckets'], sample['cumulative']):
+                lines.append(f"{name}_bucket{_format_labels(names, values, ('le', repr(float(bound))))} {count}")
+            lines.append(f"{name}_bucket{_format_labels(names, values, ('le', '+Inf'))} {sample['count']}")
+            lines.append(f"{name}_sum{_format_labels(names, values)} {sample['sum']}")
+            lines.append(f"{name}_count{_format_labels(names, values)} {sample['count']}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsFileExporter(threading.Thread):
+    def __init__(self, registry, path, interval=5.0):
+        """
+        Periodically write a registry snapshot to a JSON file
+
+        Lets a dashboard running in another process serve the tracker's metrics.
+
+        Args:
+            registry (Registry): Metrics to export
+            path (str): Snapshot file, replaced atomically on each write
+            interval (float): Seconds between writes
+        """
+        super().__init__(name="metrics-exporter", daemon=True)
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.export()
+
+    def export(self):
+        temporary_path = self.path + ".tmp"
+        try:
+            with open(temporary_path, "w") as f:
+                json.dump({'time': time.time(), 'families': self.registry.snapshot()}, f)
+            os.replace(temporary_path, self.path)
+        except OSError as err:
+            print(f"Error exporting metrics: {err}")
+
+    def stop(self):
+        self._stop_event.set()
+        self.export()
+
+
+def read_snapshot_file(path, max_age=60.0):
+    """
+    Metric families exported by MetricsFileExporter
+
+    Returns:
+        list: Families, or None if the file is missing or older than max_age seconds
+    """
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - snapshot.get('time', 0) > max_age:
+        return None
+    return snapshot['families']
+
+
+def summarize(families):
+    """
+    Compact view of a snapshot for the dashboard
+
+    Returns:
+        dict: metric name -> label values joined by "/" -> value, or count
+            and mean milliseconds for histograms
+    """
+    summary = {}
+    for family in families:
+        values = {}
+        for sample in family['samples']:
+            key = "/".join(sample['labels']) or "total"
+            if family['type'] == "histogram":
+                mean_ms = sample['sum'] / sample['count'] * 1000 if sample['count'] else 0.0
+                values[key] = {'count': sample['count'], 'mean_ms': round(mean_ms, 2)}
+            else:
+                values[key] = sample['value']
+        summary[family['name']] = values
+    return summary
+
+
+REGISTRY = Registry()
+
+# Metrics shared by the tracker and the dashboard
+INFERENCE_SECONDS = REGISTRY.histogram("anpr_inference_seconds", "Model inference latency", ["model"])
+OCR_SECONDS = REGISTRY.histogram("anpr_ocr_seconds", "OCR latency per plate", ["path"])
+OCR_ATTEMPTS = REGISTRY.counter("anpr_ocr_attempts_total", "OCR attempts by preprocessing strategy",
+                                ["strategy", "result"])
+STAGE_SECONDS = REGISTRY.histogram("anpr_stage_seconds", "Pipeline stage latency", ["stage"])
+FRAMES = REGISTRY.counter("anpr_frames_total", "Captured frames by outcome", ["result"])
+DB_SECONDS = REGISTRY.histogram("anpr_db_seconds", "Database call latency", ["operation"])
+DB_ERRORS = REGISTRY.counter("anpr_db_errors_total", "Database errors")
+IMAGE_WRITE_SECONDS = REGISTRY.histogram("anpr_image_write_seconds", "Capture and thumbnail encode and write latency")
+QUEUE_DEPTH = REGISTRY.gauge("anpr_queue_depth", "Items waiting in a queue", ["queue"])
+MODEL_STARTUP_SECONDS = REGISTRY.gauge("anpr_model_startup_seconds", "Cold-start time per model", ["model", "phase"])
+SCHEDULER_INTERVAL = REGISTRY.gauge("anpr_scheduler_interval", "Captured frames per processed frame")
+SCHEDULER_MODE = REGISTRY.gauge("anpr_scheduler_mode", "1 for the scheduler's current mode, 0 otherwise", ["mode"])
+SCHEDULER_FPS = REGISTRY.gauge("anpr_scheduler_fps", "Camera and processing frame rate", ["kind"])
+SCHEDULER_FRAME_COST_SECONDS = REGISTRY.gauge("anpr_scheduler_frame_cost_seconds",
+                                              "Estimated processing time per frame")
@@ -0,0 +1,110 @@
+import cv2
+import numpy as np
+
+
+def parse_roi(text):
+    """
+    Parse a region of interest polygon
+
+    Args:
+        text (str): Points as "x,y;x,y;..." in fractions of the frame size, e.g. "0,0.4;1,0.4;1,1;0,1"
+
+    Returns:
+        list: (x, y) tuples, or None for an empty string
+    """
+    if not text:
+        return None
+    points = [tuple(float(value) for value in point.split(",")) for point in text.split(";") if point.strip()]
+    if len(points) < 3 or any(len(point) != 2 for point in points):
+        raise ValueError(f"ROI needs at least three x,y points: {text!r}")
+    return points
+
+
+class MotionGate:
+    def __init__(self, roi=None, scale=0.25, method="diff", threshold=25, min_area=0.002,
+                 padding=0.1, hold=2.0):
+        """
+        Cheap motion check on a downscaled grayscale frame, run before any neural network
+
+        Args:
+            roi (list): Region of interest polygon as (x, y) fractions of the frame, None for the whole frame
+            scale (float): Downscale factor applied before differencing
+            method (str): "diff" for frame differencing, "mog2" for MOG2 background subtraction
+            threshold (int): Grey level change that counts as motion, for frame differencing
+            min_area (float): Fraction of the ROI that must change to count as motion
+            padding (float): Margin added around the motion box, as a fraction of its size
+            hold (float): Seconds the gate stays open after the last motion, so a vehicle
+                that stops at the gate is still processed
+        """
+        if method not in ("diff", "mog2"):
+            raise ValueError(f"Unknown motion method: {method}")
+        self.roi = roi
+        self.scale = scale
+        self.method = method
+        self.threshold = threshold
+        self.min_area = min_area
+        self.padding = padding
+        self.hold = hold
+        self.frames = 0
+        self.motion_frames = 0
+        self._previous = None
+        self._mask = None
+        self._subtractor = cv2.createBackgroundSubtractorMOG2(detectShadows=False) if method == "mog2" else None
+        self._last_box = None
+        self._last_motion = None
+
+    def _roi_mask(self, shape):
+        """ROI mask at the downscaled size, rebuilt only when the frame size changes"""
+        if self._mask is None or self._mask.shape != shape:
+            if self.roi is None:
+                self._mask = np.full(shape, 255, dtype=np.uint8)
+            else:
+                height, width = shape
+                polygon = np.array([[x * (width - 1), y * (height - 1)] for x, y in self.roi], dtype=np.int32)
+                self._mask = np.zeros(shape, dtype=np.uint8)
+                cv2.fillPoly(self._mask, [polygon], 255)
+        return self._mask
+
+    def check(self, frame, timestamp):
+        """
+        Look for motion inside the region of interest
+
+        Args:
+            frame (numpy.ndarray): Full-size BGR frame
+            timestamp (float): Capture time of the frame
+
+        Returns:
+            tuple: (x1, y1, x2, y2) box around the motion in full-frame pixels, or None if
+                nothing moved and the hold time has passed
+        """
+        self.frames += 1
+        small = cv2.resize(frame, (0, 0), fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+        mask = self._roi_mask(gray.shape)
+
+        if self._subtractor is not None:
+            changed = self._subtractor.apply(gray)
+        elif self._previous is None:
+            self._previous = gray
+            return None
+        else:
+            changed = cv2.threshold(cv2.absdiff(gray, self._previous), self.threshold, 255, cv2.THRESH_BINARY)[1]
+            self._previous = gray
+        changed = cv2.bitwise_and(cv2.dilate(changed, None, iterations=2), mask)
+
+        if cv2.countNonZero(changed) >= self.min_area * cv2.countNonZero(mask):
+            x, y, width, height = cv2.boundingRect(changed)
+            pad_x, pad_y = width * self.padding, height * self.padding
+            frame_height, frame_width = frame.shape[:2]
+            self._last_box = (
+                max(0, int((x - pad_x) / self.scale)),
+                max(0, int((y - pad_y) / self.scale)),
+                min(frame_width, int((x + width + pad_x) / self.scale)),
+                min(frame_height, int((y + height + pad_y) / self.scale))
+            )
+            self._last_motion = timestamp
+        elif self._last_motion is None or timestamp - self._last_motion > self.hold:
+            return None
+
+        self.motion_frames += 1
+        return self._last_box
@@ -1,3 +1,5 @@
+import socket
+import time
 import webbrowser
 
 def open_dashboard():
@@ -9,5 +11,26 @@ def open_dashboard():
     except Exception as e:
         print(f"Error opening dashboard: {e}")
 
+def wait_for_dashboard(host="localhost", port=5000, timeout=30.0):
+    """
+    Wait until the dashboard server accepts connections
+
+    Args:
+        host (str): Dashboard host
+        port (int): Dashboard port
+        timeout (float): Seconds to wait before giving up
+
+    Returns:
+        bool: True if the server is ready
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
 if __name__ == "__main__":
     open_dashboard()
\ No newline at end of file
@@ -0,0 +1,217 @@
+import queue
+import threading
+import time
+from datetime import datetime
+
+from src.image_store import ImageStore
+from src.storage import StorageError
+
+
+class DetectionRecord:
+    __slots__ = ('plate_number', 'vehicle_type', 'confidence', 'frame', 'detection_time')
+
+    def __init__(self, plate_number, vehicle_type, confidence, frame, detection_time=None):
+        """
+        A finished detection waiting to be written
+
+        Args:
+            plate_number (str): Normalized plate number
+            vehicle_type (str): Vehicle class name
+            confidence (float): Vehicle detection confidence
+            frame (numpy.ndarray): Image to store for this detection
+            detection_time (datetime): Time of the detection, defaults to now
+        """
+        self.plate_number = plate_number
+        self.vehicle_type = vehicle_type
+        self.confidence = confidence
+        self.frame = frame
+        self.detection_time = detection_time or datetime.now()
+
+
+class DetectionWriter:
+    def __init__(self, storage, capture_folder, on_saved=None, batch_size=20,
+                 batch_window=1.0, max_pending=1000, max_retries=5, retry_delay=1.0, image_store=None):
+        """
+        Write-behind queue for detected_vehicles
+
+        Detections are collected on a background thread and written as one
+        batched upsert per batch or time window, so the frame loop never waits
+        for the database. A plate keeps only its highest-confidence row: lower
+        confidence detections are skipped and the replaced capture is deleted.
+
+        Args:
+            storage (Storage): Storage backend receiving the detections
+            capture_folder (str): Folder the capture images are written to
+            on_saved (callable): Called with (plate_number, capture_path) after commit
+            batch_size (int): Maximum detections per transaction
+            batch_window (float): Seconds to wait for more detections before committing
+            max_pending (int): Detections held in memory before new ones are dropped
+            max_retries (int): Attempts per batch before it is discarded
+            retry_delay (float): Initial delay between reconnect attempts, doubled each retry
+            image_store (ImageStore): Writes the capture images, defaults to one rooted at capture_folder
+        """
+        self.storage = storage
+        self.capture_folder = capture_folder
+        self.image_store = image_store or ImageStore(capture_folder)
+        self.on_saved = on_saved
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+
+        self.saved = 0
+        self.skipped = 0
+        self.dropped = 0
+        self.errors = 0
+
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="detection-writer", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def submit(self, record: DetectionRecord) -> bool:
+        """
+        Queue a detection for writing without blocking
+
+        Returns:
+            bool: False if the queue is full and the detection was dropped
+        """
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print(f"Persistence queue full, dropping detection for {record.plate_number}")
+            return False
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def stop(self, timeout=None):
+        """
+        Write everything still queued, then stop the writer thread
+
+        The image store is only shut down once the writer has finished, since
+        a batch still being retried saves its images again.
+
+        Args:
+            timeout (float): Seconds to wait for the writer, by default long enough for a
+                batch to go through all its retries
+        """
+        self._stop_event.set()
+        if timeout is None:
+            # Backoff of max_retries attempts: retry_delay * (1 + 2 + ... + 2^(max_retries - 2))
+            timeout = self.retry_delay * (2 ** (self.max_retries - 1) - 1) + 5.0
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+        if self._thread.is_alive():
+            print(f"Detection writer still busy after {timeout:.0f}s, {self.pending()} detections not written")
+            return
+        self.image_store.shutdown()
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            if batch:
+                self._write_with_retry(batch)
+            elif self._stop_event.is_set():
+                break
+
+    def _collect_batch(self):
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stop_event.is_set():
+                # While stopping, take whatever is left without waiting
+                try:
+                    batch.append(self._queue.get_nowait())
+                    continue
+                except queue.Empty:
+                    break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _write_with_retry(self, batch):
+        delay = self.retry_delay
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                self._write_batch(batch)
+                return
+            except StorageError as err:
+                self.errors += 1
+                print(f"Error writing detections (attempt {attempt}/{self.max_retries}): {err}")
+                if attempt < self.max_retries:
+                    time.sleep(delay)
+                    delay *= 2
+        print(f"Discarding {len(batch)} detections after {self.max_retries} failed attempts")
+
+    def _write_batch(self, batch):
+        # Only the most confident detection of each plate in the batch matters
+        best = {}
+        for record in batch:
+            current = best.get(record.plate_number)
+            if current is None or record.confidence > current.confidence:
+                best[record.plate_number] = record
+
+        existing = self.storage.get_detections(best)
+
+        # Encode and write all images of the batch in parallel on the image store's pool
+        pending = []
+        for plate_number, record in best.items():
+            if plate_number in existing and record.confidence <= existing[plate_number][0]:
+                self.skipped += 1
+                print(f"Ignoring lower confidence detection for {plate_number}: "
+                      f"{record.confidence} <= {existing[plate_number][0]}")
+                continue
+            pending.append((plate_number, record, self.image_store.save(plate_number, record.detection_time, record.frame)))
+
+        rows = []
+        written = []
+        replaced = []
+        for plate_number, record, future in pending:
+            try:
+                filepath, thumbnail_path = future.result()
+            except (OSError, ValueError) as err:
+                print(f"Failed to write capture for {plate_number}: {err}")
+                continue
+
+            rows.append((plate_number, record.vehicle_type, record.confidence, filepath, thumbnail_path,
+                         record.detection_time))
+            written.append((plate_number, filepath, thumbnail_path))
+            if plate_number in existing:
+                replaced.extend(existing[plate_number][1:])
+
+        if not rows:
+            return
+
+        try:
+            self.storage.upsert_detections(rows)
+        except StorageError:
+            self.image_store.delete(path for _, filepath, thumbnail_path in written
+                                    for path in (filepath, thumbnail_path))
+            raise
+
+        self.saved += len(rows)
+        print(f"Saved {len(rows)} detections to database")
+
+        # The same crop hashes to the same path, so never delete a file that was just written
+        new_paths = {path for _, filepath, thumbnail_path in written for path in (filepath, thumbnail_path)}
+        old_paths = [path for path in replaced if path and path not in new_paths]
+        self.image_store.delete(old_paths)
+        if old_paths:
+            print(f"Deleted {len(old_paths)} replaced capture files")
+
+        if self.on_saved is not None:
+            for plate_number, filepath, _ in written:
+                self.on_saved(plate_number, filepath)
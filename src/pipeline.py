@@ -0,0 +1,223 @@
+import threading
+import time
+from collections import deque
+
+from src.metrics import FRAMES
+
+
+class DropOldestQueue:
+    def __init__(self, maxsize=2, on_drop=None):
+        """
+        Bounded FIFO queue that never blocks the producer
+
+        When the queue is full, the oldest item is discarded to make room for
+        the new one, so a slow consumer always works on the freshest data.
+
+        Args:
+            maxsize (int): Maximum number of items held at once
+            on_drop (callable): Called with every item discarded to make room
+        """
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.on_drop = on_drop
+        self.dropped = 0
+        self._items = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def put(self, item):
+        """
+        Add an item, dropping the oldest one if the queue is full
+
+        Args:
+            item: Item to enqueue
+
+        Returns:
+            bool: True if an older item had to be dropped
+        """
+        with self._condition:
+            dropped = None
+            if len(self._items) >= self.maxsize:
+                dropped = self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._condition.notify()
+        if dropped is not None and self.on_drop is not None:
+            self.on_drop(dropped)
+        return dropped is not None
+
+    def get(self, timeout=None):
+        """
+        Remove and return the oldest item
+
+        Args:
+            timeout (float): Seconds to wait for an item, None waits forever
+
+        Returns:
+            The next item, or None on timeout or once the queue is closed and empty
+        """
+        with self._condition:
+            if not self._items and not self._closed:
+                self._condition.wait(timeout)
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    def close(self):
+        """Wake up any waiting consumer; remaining items can still be drained."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def __len__(self):
+        with self._condition:
+            return len(self._items)
+
+
+class PipelineStage(threading.Thread):
+    def __init__(self, name, func, input_queue, output_queue=None, on_timing=None, on_exit=None):
+        """
+        Worker thread that applies one processing step to every queued item
+
+        Args:
+            name (str): Stage name used in logs and stats
+            func (callable): Function taking one item and returning the item for
+                the next stage, or None to stop the item here
+            input_queue (DropOldestQueue): Queue the stage consumes from
+            output_queue (DropOldestQueue): Queue the results are pushed to
+            on_timing (callable): Called with the stage name and seconds spent on each item
+            on_exit (callable): Called with every item this stage stops or, as the last stage, finishes
+        """
+        super().__init__(name=f"stage-{name}", daemon=True)
+        self.stage_name = name
+        self.func = func
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.on_timing = on_timing
+        self.on_exit = on_exit
+        self.processed = 0
+        self.busy_time = 0.0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            item = self.input_queue.get(timeout=0.1)
+            if item is None:
+                if self.input_queue.closed:
+                    break
+                continue
+
+            start = time.perf_counter()
+            try:
+                result = self.func(item)
+            except Exception as e:
+                print(f"Error in {self.stage_name} stage: {e}")
+                result = None
+            elapsed = time.perf_counter() - start
+            self.busy_time += elapsed
+            self.processed += 1
+            if self.on_timing is not None:
+                self.on_timing(self.stage_name, elapsed)
+
+            if result is not None and self.output_queue is not None:
+                if self.output_queue.put(result):
+                    FRAMES.labels(result='dropped').inc()
+            elif self.on_exit is not None:
+                self.on_exit(item)
+
+        if self.output_queue is not None:
+            self.output_queue.close()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class DetectionPipeline:
+    def __init__(self, stages, queue_size=2, on_timing=None, on_exit=None):
+        """
+        Chain of stages connected by bounded drop-oldest queues
+
+        Each stage runs on its own thread, so a slow stage only limits the
+        overall throughput instead of adding its latency to every other stage.
+
+        Args:
+            stages (list): (name, func) pairs, in processing order
+            queue_size (int): Capacity of the queue in front of each stage
+            on_timing (callable): Called with the stage name and seconds spent on each item
+            on_exit (callable): Called with every item that leaves the pipeline, whether the
+                last stage finished it, a stage stopped it or a full queue dropped it
+        """
+        self.queues = [DropOldestQueue(queue_size, on_drop=on_exit) for _ in stages]
+        self.stages = []
+        for index, (name, func) in enumerate(stages):
+            output_queue = self.queues[index + 1] if index + 1 < len(stages) else None
+            self.stages.append(PipelineStage(name, func, self.queues[index], output_queue, on_timing, on_exit))
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def submit(self, item):
+        """
+        Feed an item into the first stage without blocking
+
+        Returns:
+            bool: True if an older pending item was dropped
+        """
+        return self.queues[0].put(item)
+
+    def stop(self, timeout=2.0):
+        """Close the input queue and wait for the workers to drain and exit."""
+        self.queues[0].close()
+        for stage in self.stages:
+            stage.join(timeout)
+            stage.stop()
+
+    def stats(self):
+        """
+        Per-stage counters
+
+        Returns:
+            dict: stage name -> processed count, dropped inputs, pending inputs and busy seconds
+        """
+        return {
+            stage.stage_name: {
+                'processed': stage.processed,
+                'dropped': stage.input_queue.dropped,
+                'pending': len(stage.input_queue),
+                'busy_time': round(stage.busy_time, 3)
+            }
+            for stage in self.stages
+        }
+
+
+class FramePacket:
+    __slots__ = ('frame_id', 'frame', 'timestamp', 'motion_box', 'vehicles', 'candidates', 'plates', 'ended')
+
+    def __init__(self, frame_id, frame, timestamp=None):
+        """
+        Data passed between detection stages for one camera frame
+
+        Args:
+            frame_id (int): Sequential frame number
+            frame (numpy.ndarray): Captured frame
+            timestamp (float): Capture time, defaults to now
+        """
+        self.frame_id = frame_id
+        self.frame = frame
+        self.timestamp = timestamp if timestamp is not None else time.time()
+        # (x1, y1, x2, y2) around the motion found by the motion gate, None for the whole frame
+        self.motion_box = None
+        # Vehicle Detection objects selected for plate reading
+        self.vehicles = []
+        # (vehicle, plate box) pairs waiting for OCR
+        self.candidates = []
+        # (vehicle, plate box, plate text, track id) for every plate that was read
+        self.plates = []
+        # (vehicle, plate text, frame, timestamp) of tracks that ended before their plate vote settled
+        self.ended = []
@@ -0,0 +1,21 @@
+import re
+
+_NON_ALPHANUMERIC = re.compile(r'[^A-Z0-9]')
+
+
+def normalize_plate_number(plate_number):
+    """
+    Canonical form of a plate number used for storage and whitelist matching
+
+    Dots, spaces, dashes and any other separators are removed and letters are
+    upper-cased, so "mh.12 ab-1234" and "MH12AB1234" compare equal.
+
+    Args:
+        plate_number (str): Plate text as read by OCR or typed by a user
+
+    Returns:
+        str: Normalized plate number
+    """
+    if not plate_number:
+        return ""
+    return _NON_ALPHANUMERIC.sub("", plate_number.upper())
@@ -0,0 +1,78 @@
+from collections import defaultdict
+
+from src.plate_utils import normalize_plate_number
+
+
+class PlateVote:
+    def __init__(self, stable_reads=3, min_agreement=0.6):
+        """
+        Consensus of the plate texts read for one vehicle across frames
+
+        Every reading votes for its length and, at each position, for its
+        character, weighted by the OCR confidence. The consensus takes the
+        winning length and the winning character at each position of the
+        readings with that length, so a single misread character is outvoted
+        instead of becoming a separate plate.
+
+        Args:
+            stable_reads (int): Consecutive readings that must leave the consensus unchanged
+            min_agreement (float): Minimum share of the vote the weakest winning character needs
+        """
+        self.stable_reads = stable_reads
+        self.min_agreement = min_agreement
+        self.readings = 0
+        self._length_votes = defaultdict(float)
+        # length -> one {character: score} dict per position
+        self._char_votes = {}
+        self._consensus = None
+        self._unchanged = 0
+
+    def add(self, plate_number, confidence):
+        """
+        Add one OCR reading
+
+        Args:
+            plate_number (str): Text read from the plate
+            confidence (float): OCR confidence of the reading
+        """
+        text = normalize_plate_number(plate_number)
+        if not text:
+            return
+        self.readings += 1
+        self._length_votes[len(text)] += confidence
+        positions = self._char_votes.setdefault(len(text), [defaultdict(float) for _ in text])
+        for position, char in zip(positions, text):
+            position[char] += confidence
+
+        consensus, _ = self.result()
+        if consensus == self._consensus:
+            self._unchanged += 1
+        else:
+            self._consensus = consensus
+            self._unchanged = 1
+
+    def result(self):
+        """
+        Current consensus
+
+        Returns:
+            tuple: (plate text, agreement of its weakest character), or (None, 0.0) without readings
+        """
+        if not self.readings:
+            return None, 0.0
+        length = max(self._length_votes, key=self._length_votes.get)
+        chars = []
+        agreement = 1.0
+        for position in self._char_votes[length]:
+            char, score = max(position.items(), key=lambda item: item[1])
+            chars.append(char)
+            agreement = min(agreement, score / sum(position.values()))
+        # Readings of another length count against the winning characters too
+        agreement *= self._length_votes[length] / sum(self._length_votes.values())
+        return "".join(chars), agreement
+
+    def is_stable(self):
+        """True once the consensus has held for stable_reads readings with enough agreement"""
+        if self._unchanged < self.stable_reads:
+            return False
+        return self.result()[1] >= self.min_agreement
@@ -1,18 +1,131 @@
+import time
+
 import cv2
 from paddleocr import PaddleOCR
 import imutils
 import numpy as np
 
+from src.metrics import OCR_ATTEMPTS, OCR_SECONDS
+
+
+def plate_statistics(plate_image):
+    """
+    Cheap image statistics used to pick the OCR preprocessing
+
+    Args:
+        plate_image (numpy.ndarray): Input plate image
+
+    Returns:
+        dict: contrast (grey level std), sharpness (Laplacian variance) and skew (degrees)
+    """
+    gray = cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY) if plate_image.ndim == 3 else plate_image
+    width = gray.shape[1]
+
+    skew = 0.0
+    edges = cv2.Canny(gray, 50, 150)
+    lines = cv2.HoughLinesP(edges, 1, np.pi / 180, threshold=max(10, width // 4),
+                            minLineLength=max(10, width // 3), maxLineGap=5)
+    if lines is not None:
+        angles = [np.degrees(np.arctan2(y2 - y1, x2 - x1)) for x1, y1, x2, y2 in lines.reshape(-1, 4)]
+        angles = [angle for angle in angles if abs(angle) < 45]
+        if angles:
+            skew = float(np.median(angles))
+
+    return {
+        'contrast': float(gray.std()),
+        'sharpness': float(cv2.Laplacian(gray, cv2.CV_64F).var()),
+        'skew': skew
+    }
+
+
+def split_lines(plate_image, max_single_line_ratio=3.0):
+    """
+    Split a plate crop into its text lines by horizontal projection
+
+    Wide plates are taken as a single line. Otherwise the crop is split at
+    the emptiest row of its middle part, if that row is nearly free of ink.
+
+    Args:
+        plate_image (numpy.ndarray): Input plate image
+        max_single_line_ratio (float): Width/height ratio above which no split is tried
+
+    Returns:
+        list: One or two image bands, top to bottom
+    """
+    height, width = plate_image.shape[:2]
+    if height < 20 or width / height > max_single_line_ratio:
+        return [plate_image]
+
+    gray = cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY) if plate_image.ndim == 3 else plate_image
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    if cv2.countNonZero(ink) > ink.size / 2:
+        # Light text on a dark plate
+        ink = cv2.bitwise_not(ink)
+    profile = ink.sum(axis=1) / 255.0
+
+    low, high = int(height * 0.3), int(height * 0.7)
+    split = low + int(np.argmin(profile[low:high]))
+    peak = profile.max()
+    if peak == 0 or profile[split] > 0.15 * peak:
+        return [plate_image]
+    if profile[:split].max() < 0.3 * peak or profile[split:].max() < 0.3 * peak:
+        return [plate_image]
+    return [plate_image[:split], plate_image[split:]]
+
+
 class PlateRecognizer:
-    def __init__(self):
+    # Below these values a plate counts as low-contrast or blurry, above level_angle as skewed
+    low_contrast = 40.0
+    blurry = 100.0
+    level_angle = 3.0
+    # Shortest text the recognition-only pass accepts as a plate
+    min_plate_length = 4
+    # Assumed milliseconds per attempt until a strategy has been timed; denoising is far slower
+    strategy_cost_ms = {'raw': 30.0, 'contrast': 32.0, 'threshold': 32.0, 'deskew': 35.0, 'denoise': 120.0}
+
+    def __init__(self, recognition_only=True):
         """
         Initialize PaddleOCR with Indian English and custom configuration for license plates
+
+        Args:
+            recognition_only (bool): Try the recognition model alone on the plate crop
+                before falling back to the full detection pipeline
         """
+        self.recognition_only = recognition_only
         self.ocr = PaddleOCR(
             use_angle_cls=True,  # Detect and correct text orientation
             lang='en',  # English language detection
             show_log=False  # Disable verbose logging
         )
+        # Strategy name -> attempts, successes and milliseconds, used to reorder the strategies
+        self.strategy_stats = {
+            name: {'attempts': 0, 'successes': 0, 'ms': 0.0}
+            for name in ('recognition', 'raw', 'contrast', 'threshold', 'denoise', 'deskew')
+        }
+        # Attempts, milliseconds and winning strategy per plate of the latest read_plates call
+        self.last_reads = []
+
+    def warm_up(self, plate_shape=(48, 192, 3)):
+        """
+        Run the recognizer alone and the full detection pipeline once on a blank plate
+
+        Args:
+            plate_shape (tuple): Typical shape of a plate crop
+        """
+        plate_image = np.full(plate_shape, 255, dtype=np.uint8)
+        self.run_recognizer([plate_image])
+        self.ocr.ocr(plate_image, cls=True)
+
+    def enhance_contrast(self, plate_image):
+        """Stretch the contrast of a dull plate with CLAHE"""
+        gray = cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY)
+        return cv2.createCLAHE(clipLimit=3.0, tileGridSize=(4, 4)).apply(gray)
+
+    def threshold_plate(self, plate_image):
+        """Adaptive threshold and 2x upscale, without the slow denoising pass"""
+        gray = cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY)
+        thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+        return cv2.resize(thresh, (0, 0), fx=2, fy=2, interpolation=cv2.INTER_CUBIC)
     
     def preprocess_plate(self, plate_image):
         """
@@ -53,51 +166,263 @@ class PlateRecognizer:
         Returns:
             str: Processed license plate text or None if not detected
         """
-        if plate_image is None or plate_image.size == 0:
-            return None
-        
-        # Attempt multiple preprocessing techniques
-        for attempt in range(max_attempts):
+        plate_number, _ = self.read_plate(plate_image, max_attempts)
+        return plate_number
+
+    def read_plate(self, plate_image, max_attempts=3):
+        """
+        Read a license plate like extract_text, also returning the OCR confidence
+
+        Args:
+            plate_image (numpy.ndarray): Input plate image
+            max_attempts (int): Maximum number of full-pipeline preprocessing attempts
+
+        Returns:
+            tuple: (plate text, mean confidence of its lines), or (None, 0.0) if not detected
+        """
+        return self.read_plates([plate_image], max_attempts)[0]
+
+    def read_plates(self, plate_images, max_attempts=3):
+        """
+        Read several license plates, batching the recognition-only pass
+
+        Plates are first recognized without PaddleOCR's text detector, all in
+        one recognizer call. Plates that pass are done; the rest go through the
+        full detection pipeline with the adaptive preprocessing strategies.
+        Attempts and milliseconds per plate are left in last_reads.
+
+        Args:
+            plate_images (list): Plate crops
+            max_attempts (int): Maximum number of full-pipeline preprocessing attempts
+
+        Returns:
+            list: (plate text, confidence) per plate, (None, 0.0) where nothing was read
+        """
+        results = [(None, 0.0)] * len(plate_images)
+        self.last_reads = [{'attempts': 0, 'ms': 0.0, 'strategy': None} for _ in plate_images]
+        pending = [index for index, image in enumerate(plate_images) if image is not None and image.size > 0]
+
+        if self.recognition_only and pending:
+            start = time.perf_counter()
+            recognized = self.recognize_lines([plate_images[index] for index in pending])
+            elapsed = (time.perf_counter() - start) * 1000
+            record = self.strategy_stats['recognition']
+            record['attempts'] += len(pending)
+            record['ms'] += elapsed
+            for index, result in zip(pending, recognized):
+                self.last_reads[index]['attempts'] += 1
+                self.last_reads[index]['ms'] += elapsed / len(pending)
+                OCR_SECONDS.labels(path='recognition').observe(elapsed / len(pending) / 1000)
+                OCR_ATTEMPTS.labels(strategy='recognition', result='success' if result[0] else 'failure').inc()
+                if result[0]:
+                    record['successes'] += 1
+                    results[index] = result
+                    self.last_reads[index]['strategy'] = 'recognition'
+
+        for index in pending:
+            if results[index][0]:
+                continue
+            start = time.perf_counter()
+            results[index], attempts, strategy = self.read_full(plate_images[index], max_attempts)
+            elapsed = time.perf_counter() - start
+            OCR_SECONDS.labels(path='full').observe(elapsed)
+            self.last_reads[index]['attempts'] += attempts
+            self.last_reads[index]['ms'] += elapsed * 1000
+            self.last_reads[index]['strategy'] = strategy
+
+        for read in self.last_reads:
+            read['ms'] = round(read['ms'], 1)
+        return results
+
+    def recognize_lines(self, plate_images):
+        """
+        Recognize plates with the recognition model only, skipping text detection
+
+        Each plate is deskewed if needed and split into its text lines by
+        horizontal projection, and all lines of all plates are recognized in a
+        single batched call.
+
+        Args:
+            plate_images (list): Non-empty plate crops
+
+        Returns:
+            list: (plate text, mean line confidence) per plate, (None, 0.0) if any line is unsure
+        """
+        lines = []
+        line_counts = []
+        for plate_image in plate_images:
+            skew = plate_statistics(plate_image)['skew']
+            if abs(skew) > self.level_angle:
+                plate_image = imutils.rotate_bound(plate_image, angle=-skew)
+            plate_lines = split_lines(plate_image)
+            lines.extend(plate_lines)
+            line_counts.append(len(plate_lines))
+
+        try:
+            recognized = self.run_recognizer(lines)
+        except Exception as e:
+            print(f"Recognition-only OCR failed: {e}")
+            return [(None, 0.0)] * len(plate_images)
+
+        results = []
+        offset = 0
+        for count in line_counts:
+            plate_lines = recognized[offset:offset + count]
+            offset += count
+            text = "".join(line_text.replace(" ", "").upper() for line_text, _ in plate_lines)
+            confidences = [confidence for _, confidence in plate_lines]
+            if len(text) >= self.min_plate_length and min(confidences) > 0.7:
+                results.append((text, sum(confidences) / len(confidences)))
+            else:
+                results.append((None, 0.0))
+        return results
+
+    def run_recognizer(self, images):
+        """
+        Run the recognition model alone on text line crops, as one batch
+
+        Calls PaddleOCR's TextRecognizer directly: every 2.x release has it,
+        while ocr(det=False) only takes a list of crops in some of them.
+
+        Args:
+            images (list): BGR text line crops
+
+        Returns:
+            list: (text, confidence) per crop
+        """
+        recognized, _ = self.ocr.text_recognizer(images)
+        return recognized
+
+    def read_full(self, plate_image, max_attempts=3):
+        """
+        Read a plate with the full PaddleOCR pipeline, trying preprocessing strategies in turn
+
+        Preprocessing strategies are ordered by their success rate so far, with
+        a bonus for the ones the plate's contrast, sharpness and skew call for,
+        and reading stops at the first strategy that finds text. The angle
+        classifier only runs on plates that are not level.
+
+        Args:
+            plate_image (numpy.ndarray): Input plate image
+            max_attempts (int): Maximum number of preprocessing attempts
+
+        Returns:
+            tuple: ((plate text, confidence), attempts made, strategy that succeeded or None)
+        """
+        stats = plate_statistics(plate_image)
+        skewed = abs(stats['skew']) > self.level_angle
+        strategies = self.order_strategies(stats)[:max_attempts]
+
+        result = (None, 0.0)
+        attempts = 0
+        for strategy in strategies:
+            attempt_start = time.perf_counter()
+            attempts += 1
             try:
-                # Apply different preprocessing based on attempt
-                if attempt == 0:
-                    # Original image
+                if strategy == 'raw':
                     processed_image = plate_image
-                elif attempt == 1:
-                    # Preprocess with adaptive thresholding
+                elif strategy == 'contrast':
+                    processed_image = self.enhance_contrast(plate_image)
+                elif strategy == 'threshold':
+                    processed_image = self.threshold_plate(plate_image)
+                elif strategy == 'denoise':
                     processed_image = self.preprocess_plate(plate_image)
                 else:
-                    # Try rotating the image
-                    processed_image = imutils.rotate_bound(plate_image, angle=5 * attempt)
-                
-                # Perform OCR detection
-                results = self.ocr.ocr(processed_image, cls=True)
-                
-                # Process and filter results
-                if results and results[0] is not None:
-                    # Collect detected text with their bounding box coordinates
-                    detected_texts_with_coords = []
-                    for line in results[0]:
-                        if line is None:
-                            continue
-                        # line[0] contains the bounding box coordinates: [[x1, y1], [x2, y2], [x3, y3], [x4, y4]]
-                        # line[1] contains the text and confidence: (text, confidence)
-                        text, confidence = line[1]
-                        if confidence > 0.7:  # High confidence threshold
-                            # Get the top-left y-coordinate for sorting (line[0][0][1] is y1)
-                            y_coord = line[0][0][1]
-                            detected_texts_with_coords.append((y_coord, text.replace(" ", "").upper()))
-                    
-                    # Sort by y-coordinate to ensure top-to-bottom order
-                    detected_texts_with_coords.sort(key=lambda x: x[0])
-                    
-                    # Combine all detected texts into a single string
-                    if detected_texts_with_coords:
-                        # Join the texts (you can add a separator if needed, e.g., a space or newline)
-                        combined_text = "".join(text for _, text in detected_texts_with_coords)
-                        return combined_text
-            
+                    # Rotate by the measured skew instead of a fixed angle
+                    processed_image = imutils.rotate_bound(plate_image, angle=-stats['skew'])
+
+                # A deskewed or level plate does not need the angle classifier
+                use_cls = skewed and strategy != 'deskew'
+                result = self.parse_results(self.ocr.ocr(processed_image, cls=use_cls))
             except Exception as e:
-                print(f"OCR attempt {attempt + 1} failed: {e}")
-        
-        return None
\ No newline at end of file
+                print(f"OCR attempt {attempts} ({strategy}) failed: {e}")
+
+            record = self.strategy_stats[strategy]
+            record['attempts'] += 1
+            record['ms'] += (time.perf_counter() - attempt_start) * 1000
+            OCR_ATTEMPTS.labels(strategy=strategy, result='success' if result[0] else 'failure').inc()
+            if result[0]:
+                record['successes'] += 1
+                return result, attempts, strategy
+
+        return result, attempts, None
+
+    def order_strategies(self, stats):
+        """
+        Preprocessing strategies for a plate, most promising first
+
+        Args:
+            stats (dict): Output of plate_statistics
+
+        Returns:
+            list: Strategy names
+        """
+        suggested = set()
+        if stats['contrast'] < self.low_contrast:
+            suggested.add('contrast')
+        if stats['sharpness'] < self.blurry:
+            suggested.add('threshold')
+        candidates = ['raw', 'contrast', 'threshold', 'denoise']
+        if abs(stats['skew']) > self.level_angle:
+            candidates.append('deskew')
+            suggested.add('deskew')
+
+        def score(name):
+            record = self.strategy_stats[name]
+            # Laplace-smoothed success rate, so untried strategies start at 0.5
+            rate = (record['successes'] + 1) / (record['attempts'] + 2)
+            # Average time smoothed towards the cost prior with two assumed attempts
+            ms = (record['ms'] + 2 * self.strategy_cost_ms[name]) / (record['attempts'] + 2)
+            return rate * (1.5 if name in suggested else 1.0) / ms
+
+        # Trying strategies in order of success per millisecond minimizes the expected time per plate;
+        # sorted is stable, so ties keep the cheap-first order of candidates
+        return sorted(candidates, key=score, reverse=True)
+
+    def parse_results(self, results):
+        """
+        Combine the confident lines of a PaddleOCR result, top to bottom
+
+        Returns:
+            tuple: (plate text, mean line confidence), or (None, 0.0) if nothing confident was read
+        """
+        if not results or results[0] is None:
+            return None, 0.0
+
+        # Collect detected text with their bounding box coordinates
+        detected_texts_with_coords = []
+        for line in results[0]:
+            if line is None:
+                continue
+            # line[0] contains the bounding box coordinates: [[x1, y1], [x2, y2], [x3, y3], [x4, y4]]
+            # line[1] contains the text and confidence: (text, confidence)
+            text, confidence = line[1]
+            if confidence > 0.7:  # High confidence threshold
+                # Get the top-left y-coordinate for sorting (line[0][0][1] is y1)
+                y_coord = line[0][0][1]
+                detected_texts_with_coords.append((y_coord, text.replace(" ", "").upper(), confidence))
+
+        if not detected_texts_with_coords:
+            return None, 0.0
+
+        # Sort by y-coordinate to ensure top-to-bottom order, then join into a single string
+        detected_texts_with_coords.sort(key=lambda x: x[0])
+        combined_text = "".join(text for _, text, _ in detected_texts_with_coords)
+        confidence = sum(conf for _, _, conf in detected_texts_with_coords) / len(detected_texts_with_coords)
+        return combined_text, confidence
+
+    def strategy_report(self):
+        """
+        Per-strategy counters
+
+        Returns:
+            dict: strategy name -> attempts, success rate and average milliseconds
+        """
+        return {
+            name: {
+                'attempts': record['attempts'],
+                'success_rate': round(record['successes'] / record['attempts'], 3) if record['attempts'] else None,
+                'avg_ms': round(record['ms'] / record['attempts'], 1) if record['attempts'] else None
+            }
+            for name, record in self.strategy_stats.items()
+        }
@@ -0,0 +1,128 @@
+import csv
+import os
+import time
+
+import cv2
+import numpy as np
+
+from src.plate_utils import normalize_plate_number
+
+
+def read_frames(path, every_n=1):
+    """Yield every n-th frame of a video file or the images of a directory"""
+    if os.path.isdir(path):
+        for index, name in enumerate(sorted(os.listdir(path))):
+            if index % every_n == 0:
+                frame = cv2.imread(os.path.join(path, name))
+                if frame is not None:
+                    yield frame
+        return
+
+    cap = cv2.VideoCapture(path)
+    index = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if index % every_n == 0:
+            yield frame
+        index += 1
+    cap.release()
+
+
+def source_fps(path, default=10.0):
+    """Frame rate of a video file, or the default for image directories and unknown rates"""
+    if os.path.isdir(path):
+        return default
+    cap = cv2.VideoCapture(path)
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    cap.release()
+    return fps if fps and fps > 0 else default
+
+
+class FramePacer:
+    def __init__(self, fps, realtime=False):
+        """
+        Timestamps replayed frames as if they came from a camera
+
+        In real-time mode frames are released at the source frame rate and
+        frames whose slot has already passed are dropped, as a live camera
+        would. Otherwise frames are released as fast as they are consumed,
+        with timestamps spaced at the source rate so tracking windows behave
+        as they would live.
+
+        Args:
+            fps (float): Frame rate of the source
+            realtime (bool): Wait for each frame's slot instead of running flat out
+        """
+        self.period = 1.0 / fps
+        self.realtime = realtime
+        self.dropped = 0
+
+    def pace(self, frames):
+        """
+        Yield (timestamp, frame) pairs
+
+        Args:
+            frames (iterable): Frames in source order
+        """
+        start = time.time()
+        for index, frame in enumerate(frames):
+            due = start + index * self.period
+            if not self.realtime:
+                yield due, frame
+                continue
+            now = time.time()
+            if now > due + self.period:
+                self.dropped += 1
+                continue
+            if now < due:
+                time.sleep(due - now)
+            yield time.time(), frame
+
+
+def load_ground_truth(path):
+    """Plate numbers listed in the plate_number column of a CSV file"""
+    with open(path, newline="") as f:
+        return {normalize_plate_number(row["plate_number"]) for row in csv.DictReader(f)}
+
+
+def compare_plates(found, truth):
+    """
+    Score the plates found against the ground truth
+
+    Returns:
+        dict: recall, precision and the missed and unexpected plates
+    """
+    found = set(found)
+    matched = found & truth
+    return {
+        'recall': round(len(matched) / len(truth), 3) if truth else None,
+        'precision': round(len(matched) / len(found), 3) if found else None,
+        'missed': sorted(truth - found),
+        'unexpected': sorted(found - truth)
+    }
+
+
+def latency_summary(samples):
+    """
+    Percentiles of stage latencies
+
+    Args:
+        samples (dict): stage name -> list of seconds
+
+    Returns:
+        dict: stage name -> count, p50, p95 and p99 in milliseconds
+    """
+    summary = {}
+    for stage, values in samples.items():
+        if not values:
+            continue
+        p50, p95, p99 = np.percentile(np.asarray(values) * 1000, [50, 95, 99])
+        summary[stage] = {
+            'count': len(values),
+            'p50_ms': round(float(p50), 2),
+            'p95_ms': round(float(p95), 2),
+            'p99_ms': round(float(p99), 2)
+        }
+    return summary
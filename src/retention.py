@@ -0,0 +1,145 @@
+import os
+import threading
+from datetime import date, datetime, time, timedelta
+
+from src.storage import StorageError
+
+
+class RetentionManager:
+    def __init__(self, storage, image_store, max_age_days=5, max_bytes=None, interval=3600.0):
+        """
+        Background deletion of old detections, rows and images together
+
+        Rows are removed through the detection_time index and images a whole
+        day directory at a time, since the image store partitions captures by
+        date; captures from before that partitioning, loose in the root, go by
+        file age. Day sizes come from the byte totals the image store keeps per
+        day, so the size cap never lists the capture files.
+
+        Args:
+            storage (Storage): Storage backend holding the detections
+            image_store (ImageStore): Store the captures were written to
+            max_age_days (int): Days a detection is kept
+            max_bytes (int): Cap on the size of the capture folder, None for no cap
+            interval (float): Seconds between sweeps
+        """
+        self.storage = storage
+        self.image_store = image_store
+        self.max_age_days = max_age_days
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self.deleted_rows = 0
+        self.deleted_days = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Sweep once now, then every interval on a background thread"""
+        self._thread = threading.Thread(target=self._run, name="retention", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.sweep()
+            except StorageError as err:
+                print(f"Error applying retention: {err}")
+            self._stop_event.wait(self.interval)
+
+    def sweep(self, now=None):
+        """Apply the age limit, then the size cap, and save the image store's byte totals"""
+        now = now or datetime.now()
+        cutoff = now - timedelta(days=self.max_age_days)
+        self.purge_before(cutoff)
+        for day, path in self.day_directories():
+            if day < cutoff.date():
+                self.remove_day(day, path)
+        self.remove_loose_files(cutoff)
+
+        if self.max_bytes is not None:
+            self.enforce_size_cap(now.date())
+        self.image_store.save_usage()
+
+    def purge_before(self, cutoff):
+        """Delete the rows detected before cutoff and their images, in one statement"""
+        deleted, paths = self.storage.purge_detections_before(cutoff)
+        self.image_store.delete(paths)
+        if deleted:
+            self.deleted_rows += deleted
+            print(f"Retention removed detections older than {cutoff:%Y-%m-%d %H:%M}")
+
+    def day_directories(self):
+        """
+        Date partitions of the image store, oldest first
+
+        Returns:
+            list: (date, path) of every root/YYYY/MM/DD directory
+        """
+        days = []
+        for year in self._numeric_entries(self.image_store.root):
+            year_path = os.path.join(self.image_store.root, year)
+            for month in self._numeric_entries(year_path):
+                month_path = os.path.join(year_path, month)
+                for day in self._numeric_entries(month_path):
+                    try:
+                        days.append((date(int(year), int(month), int(day)), os.path.join(month_path, day)))
+                    except ValueError:
+                        continue
+        days.sort()
+        return days
+
+    def remove_loose_files(self, cutoff):
+        """
+        Delete files directly in the capture root created before cutoff
+
+        Captures written before the image store partitioned them by date sit
+        in the root, some without a row referencing them, so they are aged out
+        by file time like the old capture folder cleanup did.
+        """
+        cutoff_time = cutoff.timestamp()
+        removed = 0
+        try:
+            entries = list(os.scandir(self.image_store.root))
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_ctime < cutoff_time:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                continue
+        if removed:
+            print(f"Retention removed {removed} old capture files from {self.image_store.root}")
+
+    @staticmethod
+    def _numeric_entries(path):
+        try:
+            return [entry.name for entry in os.scandir(path) if entry.is_dir() and entry.name.isdigit()]
+        except FileNotFoundError:
+            return []
+
+    def remove_day(self, day, path):
+        self.image_store.remove_day(path)
+        self.deleted_days += 1
+        print(f"Retention removed captures of {day:%Y-%m-%d}")
+
+    def enforce_size_cap(self, today):
+        """Remove whole days, oldest first, until the captures fit in max_bytes"""
+        days = self.day_directories()
+        sizes = {path: self.image_store.day_bytes(path) for _, path in days}
+        total = sum(sizes.values())
+        for day, path in days:
+            if total <= self.max_bytes:
+                return
+            if day >= today:
+                print(f"Captures of today alone exceed the {self.max_bytes} byte cap")
+                return
+            self.purge_before(datetime.combine(day + timedelta(days=1), time.min))
+            self.remove_day(day, path)
+            total -= sizes[path]
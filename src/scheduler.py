@@ -0,0 +1,116 @@
+import math
+import threading
+
+
+class AdaptiveScheduler:
+    def __init__(self, target_latency=0.5, active_budget=1.0, idle_budget=0.3,
+                 min_interval=1, max_interval=30, smoothing=0.2, pipelined=False):
+        """
+        Decide which captured frames go through detection, from measured stage latency
+
+        The interval is the number of captured frames per processed frame. It
+        is kept high enough that processing stays within a CPU budget: the
+        full budget while a vehicle track is active, a smaller one while the
+        scene is idle. While idle, frames are also spaced out to about one per
+        target_latency seconds, the longest wait before a new vehicle is seen.
+
+        Args:
+            target_latency (float): Seconds between processed frames while idle
+            active_budget (float): Share of the time spent processing while a track is active
+            idle_budget (float): Share of the time spent processing while idle
+            min_interval (int): Smallest number of captured frames per processed frame
+            max_interval (int): Largest number of captured frames per processed frame
+            smoothing (float): Weight of the newest sample in the moving averages
+            pipelined (bool): Stages run concurrently, so the slowest one sets the cost
+        """
+        self.target_latency = target_latency
+        self.active_budget = active_budget
+        self.idle_budget = idle_budget
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.smoothing = smoothing
+        self.pipelined = pipelined
+        self.interval = min_interval
+        self.active = False
+        self.captured = 0
+        self.processed = 0
+        self._since_processed = 0
+        self._stage_latency = {}
+        self._frame_period = None
+        self._last_capture = None
+        self._lock = threading.Lock()
+
+    def _average(self, previous, sample):
+        if previous is None:
+            return sample
+        return previous + self.smoothing * (sample - previous)
+
+    def record(self, stage, seconds):
+        """Add a latency sample of one stage"""
+        with self._lock:
+            self._stage_latency[stage] = self._average(self._stage_latency.get(stage), seconds)
+
+    def frame_cost(self):
+        """Estimated seconds of processing per frame, from the stage averages"""
+        with self._lock:
+            latencies = list(self._stage_latency.values())
+        if not latencies:
+            return 0.0
+        return max(latencies) if self.pipelined else sum(latencies)
+
+    def should_process(self, timestamp, active):
+        """
+        Called for every captured frame
+
+        Args:
+            timestamp (float): Capture time of the frame
+            active (bool): Whether a vehicle track is currently active
+
+        Returns:
+            bool: True if this frame should go through detection
+        """
+        if self._last_capture is not None:
+            self._frame_period = self._average(self._frame_period, timestamp - self._last_capture)
+        self._last_capture = timestamp
+        self.captured += 1
+        self._since_processed += 1
+
+        self.active = active
+        self.interval = self.choose_interval(active)
+        if self._since_processed < self.interval:
+            return False
+        self._since_processed = 0
+        self.processed += 1
+        return True
+
+    def choose_interval(self, active):
+        """Captured frames per processed frame for the current load and activity"""
+        if not self._frame_period:
+            return self.min_interval
+        fps = 1.0 / self._frame_period
+        budget = self.active_budget if active else self.idle_budget
+        interval = math.ceil(self.frame_cost() * fps / budget)
+        if not active:
+            interval = max(interval, int(self.target_latency * fps))
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def metrics(self):
+        """
+        Current scheduling decisions
+
+        Returns:
+            dict: mode, interval, camera and processing fps, frame cost and per-stage latency in ms
+        """
+        fps = 1.0 / self._frame_period if self._frame_period else 0.0
+        with self._lock:
+            stage_ms = {stage: round(seconds * 1000, 1) for stage, seconds in self._stage_latency.items()}
+        return {
+            'mode': 'active' if self.active else 'idle',
+            'interval': self.interval,
+            'camera_fps': round(fps, 1),
+            'processing_fps': round(fps / self.interval, 2),
+            'frame_cost_ms': round(self.frame_cost() * 1000, 1),
+            'captured': self.captured,
+            'processed': self.processed,
+            'stage_ms': stage_ms
+        }
@@ -0,0 +1,164 @@
+import heapq
+import threading
+import time
+
+
+class PlateSighting:
+    __slots__ = ('plate_number', 'original_plate', 'vehicle_type', 'confidence', 'timestamp', 'last_seen', 'crop')
+
+    def __init__(self, plate_number, original_plate, vehicle_type, confidence, timestamp, crop):
+        """
+        Best sighting of a plate so far
+
+        Args:
+            plate_number (str): Normalized plate number
+            original_plate (str): Plate text as read
+            vehicle_type (str): Vehicle class name
+            confidence (float): Vehicle detection confidence
+            timestamp (float): Time of this best sighting
+            crop (numpy.ndarray): Vehicle crop of the best sighting, not the full frame
+        """
+        self.plate_number = plate_number
+        self.original_plate = original_plate
+        self.vehicle_type = vehicle_type
+        self.confidence = confidence
+        self.timestamp = timestamp
+        self.last_seen = timestamp
+        self.crop = crop
+
+
+class SightingBuffer:
+    def __init__(self, quiet_window=10.0, max_entries=256, on_evict=None):
+        """
+        Bounded map of plate number -> PlateSighting, finalized once a plate goes quiet
+
+        Deadlines (last seen + quiet window) are kept in a heap, so a background
+        sweeper thread sleeps until the earliest one and evicts expired plates
+        without scanning the rest, even when no new frames arrive. When full,
+        the least recently seen plate is evicted first.
+
+        Args:
+            quiet_window (float): Seconds without a sighting before a plate is evicted
+            max_entries (int): Plates held at most
+            on_evict (callable): Called with each evicted PlateSighting, e.g. to persist it
+        """
+        self.quiet_window = quiet_window
+        self.max_entries = max_entries
+        self.on_evict = on_evict
+        self._entries = {}
+        # (deadline, plate number, last seen); entries superseded by a later sighting are skipped
+        self._deadlines = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def __contains__(self, plate_number):
+        return plate_number in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, plate_number):
+        return self._entries.get(plate_number)
+
+    def _schedule(self, sighting):
+        heapq.heappush(self._deadlines, (sighting.last_seen + self.quiet_window, sighting.plate_number, sighting.last_seen))
+        if len(self._deadlines) > 4 * len(self._entries) + 64:
+            # Drop superseded deadlines so the heap stays proportional to the live plates
+            self._deadlines = [
+                (sighting.last_seen + self.quiet_window, plate_number, sighting.last_seen)
+                for plate_number, sighting in self._entries.items()
+            ]
+            heapq.heapify(self._deadlines)
+
+    def _is_current(self, plate_number, last_seen):
+        sighting = self._entries.get(plate_number)
+        return sighting is not None and sighting.last_seen == last_seen
+
+    def touch(self, plate_number, timestamp):
+        """Mark a plate as seen again without replacing its best sighting"""
+        with self._lock:
+            sighting = self._entries.get(plate_number)
+            if sighting is None:
+                return
+            sighting.last_seen = timestamp
+            self._schedule(sighting)
+
+    def put(self, sighting):
+        """Store a new best sighting, evicting the least recently seen plate if full"""
+        with self._lock:
+            self._entries[sighting.plate_number] = sighting
+            self._schedule(sighting)
+            evicted = self._pop_due(float('-inf'))
+        self._wake.set()
+        self._notify(evicted)
+
+    def pop(self, plate_number):
+        with self._lock:
+            return self._entries.pop(plate_number, None)
+
+    def _pop_due(self, now):
+        """Remove plates whose deadline passed and the least recently seen beyond max_entries"""
+        evicted = []
+        while self._deadlines:
+            deadline, plate_number, last_seen = self._deadlines[0]
+            if not self._is_current(plate_number, last_seen):
+                heapq.heappop(self._deadlines)
+                continue
+            if deadline > now and len(self._entries) <= self.max_entries:
+                break
+            heapq.heappop(self._deadlines)
+            evicted.append(self._entries.pop(plate_number))
+        return evicted
+
+    def _notify(self, evicted):
+        if self.on_evict is not None:
+            for sighting in evicted:
+                self.on_evict(sighting)
+
+    def evict(self, now):
+        """
+        Remove plates not seen for quiet_window seconds before now
+
+        Returns:
+            list: Evicted sightings
+        """
+        with self._lock:
+            evicted = self._pop_due(now)
+        self._notify(evicted)
+        return evicted
+
+    def next_deadline(self):
+        """Earliest time a held plate goes quiet, or None if the buffer is empty"""
+        with self._lock:
+            while self._deadlines:
+                deadline, plate_number, last_seen = self._deadlines[0]
+                if self._is_current(plate_number, last_seen):
+                    return deadline
+                heapq.heappop(self._deadlines)
+            return None
+
+    def start(self):
+        """Start the background sweeper that evicts plates as their quiet window ends"""
+        self._thread = threading.Thread(target=self._run, name="sighting-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            deadline = self.next_deadline()
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            self._wake.wait(timeout)
+            self._wake.clear()
+            if self._stop_event.is_set():
+                break
+            try:
+                self.evict(time.time())
+            except Exception as e:
+                print(f"Error finalizing sightings: {e}")
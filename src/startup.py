@@ -0,0 +1,93 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.metrics import MODEL_STARTUP_SECONDS
+
+
+class ModelLoader:
+    def __init__(self, factories, warm_up=True):
+        """
+        Load and warm up models in parallel, off the calling thread
+
+        Each model is built by its factory on its own thread and, if it has a
+        warm_up method, run once on blank inputs, so the first real frame is
+        processed at steady-state speed. The native inference runtimes release
+        the GIL while loading and running, so the models load concurrently.
+
+        Args:
+            factories (dict): Model name -> callable building the model
+            warm_up (bool): Call each model's warm_up method after loading
+        """
+        self.factories = factories
+        self.warm_up = warm_up
+        self.timings = {}
+        self._models = {}
+        self._error = None
+        self._started = None
+        self._done = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Begin loading in the background and return immediately"""
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="model-loader", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=len(self.factories), thread_name_prefix="model-load") as executor:
+            futures = {name: executor.submit(self._load, name, factory) for name, factory in self.factories.items()}
+            for name, future in futures.items():
+                try:
+                    self._models[name] = future.result()
+                except Exception as err:
+                    print(f"Error loading {name} model: {err}")
+                    self._error = self._error or err
+        self.timings['total_s'] = round(time.perf_counter() - self._started, 3)
+        if self._error is None:
+            print(f"Models ready in {self.timings['total_s']}s: {self.timings}")
+        self._done.set()
+
+    def _load(self, name, factory):
+        start = time.perf_counter()
+        model = factory()
+        loaded = time.perf_counter()
+        if self.warm_up and hasattr(model, 'warm_up'):
+            model.warm_up()
+        warmed = time.perf_counter()
+
+        self.timings[name] = {'load_s': round(loaded - start, 3), 'warm_up_s': round(warmed - loaded, 3)}
+        MODEL_STARTUP_SECONDS.labels(model=name, phase='load').set(loaded - start)
+        MODEL_STARTUP_SECONDS.labels(model=name, phase='warm_up').set(warmed - loaded)
+        return model
+
+    def ready(self):
+        """
+        Whether every model is loaded and warm
+
+        Raises:
+            RuntimeError: If a model failed to load
+        """
+        if not self._done.is_set():
+            return False
+        if self._error is not None:
+            raise RuntimeError(f"Model loading failed: {self._error}") from self._error
+        return True
+
+    def wait(self, timeout=None):
+        """
+        Block until loading finishes
+
+        Returns:
+            bool: True if the models are ready, False on timeout
+
+        Raises:
+            RuntimeError: If a model failed to load
+        """
+        self._done.wait(timeout)
+        return self.ready()
+
+    def get(self, name):
+        """Model by name, waiting for it to be loaded"""
+        self.wait()
+        return self._models[name]
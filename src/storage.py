@@ -0,0 +1,658 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime
+
+from src.metrics import DB_ERRORS, DB_SECONDS
+from src.plate_utils import normalize_plate_number
+
+
+class StorageError(Exception):
+    """Raised when the storage backend cannot complete an operation."""
+
+
+class Storage(ABC):
+    """
+    Database access shared by the tracker and the dashboard
+
+    Subclasses provide the connection pool, the dialect-specific DDL, schema
+    migrations and the upsert statement; queries are written with %s
+    placeholders and translated here.
+    """
+    placeholder = "%s"
+    driver_error = Exception
+    upsert_detection_query = None
+    # (version, [statements]) applied once each, in order
+    migrations = []
+
+    @abstractmethod
+    def connect(self):
+        """Open a new DB-API connection"""
+
+    def acquire(self):
+        """Take a connection from the pool"""
+        return self.connect()
+
+    def release(self, conn, healthy=True):
+        """Give a connection back to the pool, or close it if it failed"""
+        conn.close()
+
+    @abstractmethod
+    def create_tables(self, cursor):
+        """Create the detection and whitelist tables if they do not exist"""
+
+    @abstractmethod
+    def add_unique_plate_key(self, cursor):
+        """Make plate_number unique in detected_vehicles on databases created without it"""
+
+    def to_db_time(self, value):
+        return value
+
+    def from_db_time(self, value):
+        return value
+
+    @contextmanager
+    def connection(self, operation="query"):
+        """
+        Pooled connection, committed on success, rolled back on error and always released
+
+        The time from acquiring the connection to releasing it is recorded
+        under the operation label of the anpr_db_seconds metric.
+
+        Args:
+            operation (str): Name of the calling operation, for metrics
+
+        Raises:
+            StorageError: If the backend reports an error
+        """
+        start = time.perf_counter()
+        try:
+            conn = self.acquire()
+        except self.driver_error as err:
+            DB_ERRORS.inc()
+            raise StorageError(f"Could not connect to database: {err}") from err
+
+        healthy = True
+        try:
+            yield conn
+            conn.commit()
+        except BaseException as err:
+            healthy = False
+            try:
+                conn.rollback()
+            except self.driver_error:
+                pass
+            if isinstance(err, self.driver_error):
+                DB_ERRORS.inc()
+                raise StorageError(str(err)) from err
+            raise
+        finally:
+            try:
+                self.release(conn, healthy)
+            except self.driver_error:
+                pass
+            DB_SECONDS.labels(operation=operation).observe(time.perf_counter() - start)
+
+    def sql(self, query):
+        if self.placeholder == "%s":
+            return query
+        return query.replace("%s", self.placeholder)
+
+    def placeholders(self, count):
+        return ", ".join([self.placeholder] * count)
+
+    def setup(self) -> bool:
+        """
+        Create the tables and apply schema upgrades
+
+        Returns:
+            bool: True if the database is ready
+        """
+        try:
+            with self.connection("setup") as conn:
+                cursor = conn.cursor()
+                self.create_tables(cursor)
+                self.normalize_whitelist_plates(cursor)
+                self.add_unique_plate_key(cursor)
+                self.apply_migrations(cursor)
+                cursor.close()
+            print("Database connection established and tables verified")
+            return True
+        except StorageError as err:
+            print(f"Database error: {err}")
+            return False
+
+    def ping(self) -> bool:
+        try:
+            with self.connection("ping") as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+                cursor.close()
+            return True
+        except StorageError as err:
+            print(f"Database connection not available: {err}")
+            return False
+
+    def apply_migrations(self, cursor):
+        """Run the schema migrations that have not been applied to this database yet"""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                applied_at VARCHAR(32) NOT NULL
+            )
+        """)
+        cursor.execute("SELECT version FROM schema_migrations")
+        applied = {row[0] for row in cursor.fetchall()}
+        for version, statements in self.migrations:
+            if version in applied:
+                continue
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.execute(
+                self.sql("INSERT INTO schema_migrations (version, applied_at) VALUES (%s, %s)"),
+                (version, datetime.now().isoformat(timespec='seconds'))
+            )
+            print(f"Applied schema migration {version}")
+
+    def normalize_whitelist_plates(self, cursor):
+        """Rewrite whitelist entries stored before plates were normalized on insert"""
+        cursor.execute("SELECT id, plate_number FROM whitelist_vehicles")
+        updates = [
+            (normalize_plate_number(plate_number), row_id)
+            for row_id, plate_number in cursor.fetchall()
+            if normalize_plate_number(plate_number) != plate_number
+        ]
+        if updates:
+            cursor.executemany(self.sql("UPDATE whitelist_vehicles SET plate_number = %s WHERE id = %s"), updates)
+            print(f"Normalized {len(updates)} whitelist plate numbers")
+
+    # Detections
+
+    def get_detections(self, plate_numbers):
+        """
+        Stored confidence and image paths of the given plates
+
+        Returns:
+            dict: plate number -> (confidence, capture_path, thumbnail_path)
+        """
+        plate_numbers = list(plate_numbers)
+        if not plate_numbers:
+            return {}
+        with self.connection("get_detections") as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT plate_number, confidence, capture_path, thumbnail_path FROM detected_vehicles "
+                f"WHERE plate_number IN ({self.placeholders(len(plate_numbers))})",
+                tuple(plate_numbers)
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+        return {row[0]: (row[1], row[2], row[3]) for row in rows}
+
+    def upsert_detections(self, rows):
+        """
+        Insert detections or replace the stored row of the same plate, in one transaction
+
+        Every written row gets the write time as updated_at, which is what
+        detections_since tails on.
+
+        Args:
+            rows (list): (plate_number, vehicle_type, confidence, capture_path, thumbnail_path,
+                detection_time) tuples
+        """
+        updated_at = self.to_db_time(datetime.now())
+        rows = [row[:5] + (self.to_db_time(row[5]), updated_at) for row in rows]
+        with self.connection("upsert_detections") as conn:
+            cursor = conn.cursor()
+            cursor.executemany(self.sql(self.upsert_detection_query), rows)
+            cursor.close()
+
+    def recent_detections(self, limit=None, before=None, since=None, until=None):
+        """
+        Detections, newest first, paged by keyset on (detection_time, id)
+
+        Args:
+            limit (int): Maximum rows to return, None for all
+            before (tuple): (detection_time, id) of the last row of the previous page
+            since (datetime): Only rows detected at or after this time
+            until (datetime): Only rows detected before this time
+
+        Returns:
+            list: dicts with id, plate_number, vehicle_type, confidence, capture_path, thumbnail_path
+                and detection_time
+        """
+        conditions = []
+        params = []
+        if since is not None:
+            conditions.append("detection_time >= %s")
+            params.append(self.to_db_time(since))
+        if until is not None:
+            conditions.append("detection_time < %s")
+            params.append(self.to_db_time(until))
+        if before is not None:
+            before_time = self.to_db_time(before[0])
+            conditions.append("(detection_time < %s OR (detection_time = %s AND id < %s))")
+            params.extend([before_time, before_time, before[1]])
+
+        query = ("SELECT id, plate_number, vehicle_type, confidence, capture_path, detection_time, "
+                 "thumbnail_path FROM detected_vehicles")
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY detection_time DESC, id DESC"
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+
+        with self.connection("recent_detections") as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.sql(query), tuple(params))
+            rows = cursor.fetchall()
+            cursor.close()
+        return [self._detection_dict(row) for row in rows]
+
+    def detections_since(self, since, limit=500):
+        """
+        Detections written or updated at or after a time, in write order
+
+        Filters on updated_at, the time of the upsert, rather than
+        detection_time: a detection is written well after it was seen, once
+        its sighting has gone quiet and the writer has flushed its batch.
+
+        Args:
+            since (datetime): Lower bound on updated_at
+            limit (int): Maximum rows to return
+
+        Returns:
+            list: Same dicts as recent_detections, plus updated_at
+        """
+        with self.connection("detections_since") as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                self.sql("SELECT id, plate_number, vehicle_type, confidence, capture_path, detection_time, "
+                         "thumbnail_path, updated_at FROM detected_vehicles WHERE updated_at >= %s "
+                         "ORDER BY updated_at, id LIMIT %s"),
+                (self.to_db_time(since), limit)
+            )
+            rows = cursor.fetchall()
+            cursor.close()
+        return [dict(self._detection_dict(row), updated_at=self.from_db_time(row[7])) for row in rows]
+
+    def purge_detections_before(self, cutoff):
+        """
+        Delete detections older than a cutoff time
+
+        Args:
+            cutoff (datetime): Rows detected before this time are removed
+
+        Returns:
+            tuple: (number of deleted rows, capture and thumbnail paths of the deleted rows)
+        """
+        cutoff = self.to_db_time(cutoff)
+        with self.connection("purge_detections_before") as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                self.sql("SELECT capture_path, thumbnail_path FROM detected_vehicles WHERE detection_time < %s"),
+                (cutoff,)
+            )
+            paths = [path for row in cursor.fetchall() for path in row if path]
+            cursor.execute(self.sql("DELETE FROM detected_vehicles WHERE detection_time < %s"), (cutoff,))
+            deleted = cursor.rowcount
+            cursor.close()
+        return deleted, paths
+
+    # Whitelist
+
+    def list_whitelist(self):
+        with self.connection("list_whitelist") as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, owner_name, plate_number, vehicle_type FROM whitelist_vehicles")
+            rows = cursor.fetchall()
+            cursor.close()
+        return [
+            {'id': row[0], 'owner_name': row[1], 'plate_number': row[2], 'vehicle_type': row[3]}
+            for row in rows
+        ]
+
+    def add_whitelist(self, owner_name, plate_number, vehicle_type):
+        """Add a whitelist entry and log the change for whitelist caches"""
+        plate_number = normalize_plate_number(plate_number)
+        with self.connection("add_whitelist") as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                self.sql("INSERT INTO whitelist_vehicles (owner_name, plate_number, vehicle_type) VALUES (%s, %s, %s)"),
+                (owner_name, plate_number, vehicle_type)
+            )
+            self._record_whitelist_change(cursor, plate_number)
+            cursor.close()
+
+    def remove_whitelist(self, entry_id):
+        """
+        Remove a whitelist entry and log the change for whitelist caches
+
+        Returns:
+            bool: True if an entry was removed
+        """
+        with self.connection("remove_whitelist") as conn:
+            cursor = conn.cursor()
+            cursor.execute(self.sql("SELECT plate_number FROM whitelist_vehicles WHERE id = %s"), (entry_id,))
+            row = cursor.fetchone()
+            if row:
+                cursor.execute(self.sql("DELETE FROM whitelist_vehicles WHERE id = %s"), (entry_id,))
+                self._record_whitelist_change(cursor, row[0])
+            cursor.close()
+        return row is not None
+
+    def whitelist_snapshot(self):
+        """
+        All whitelisted plates and the change-log version they correspond to
+
+        Returns:
+            tuple: (version, set of normalized plates)
+        """
+        with self.connection("whitelist_snapshot") as conn:
+            cursor = conn.cursor()
+            # Both reads run in one transaction, so they share a snapshot
+            cursor.execute("SELECT COALESCE(MAX(id), 0) FROM whitelist_changes")
+            version = cursor.fetchone()[0]
+            cursor.execute("SELECT plate_number FROM whitelist_vehicles")
+            plates = {normalize_plate_number(row[0]) for row in cursor.fetchall()}
+            cursor.close()
+        return version, plates
+
+    def whitelist_changes_since(self, version):
+        """
+        Plates touched by whitelist changes after a version
+
+        Returns:
+            tuple: (new version, changed plates, changed plates still whitelisted)
+        """
+        with self.connection("whitelist_changes_since") as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                self.sql("SELECT id, plate_number FROM whitelist_changes WHERE id > %s ORDER BY id"), (version,)
+            )
+            changes = cursor.fetchall()
+            if not changes:
+                cursor.close()
+                return version, set(), set()
+
+            changed = {normalize_plate_number(plate) for _, plate in changes}
+            cursor.execute(
+                f"SELECT DISTINCT plate_number FROM whitelist_vehicles "
+                f"WHERE plate_number IN ({self.placeholders(len(changed))})",
+                tuple(changed)
+            )
+            present = {normalize_plate_number(row[0]) for row in cursor.fetchall()}
+            cursor.close()
+        return changes[-1][0], changed, present
+
+    def _detection_dict(self, row):
+        return {
+            'id': row[0],
+            'plate_number': row[1],
+            'vehicle_type': row[2],
+            'confidence': row[3],
+            'capture_path': row[4],
+            'detection_time': self.from_db_time(row[5]),
+            'thumbnail_path': row[6]
+        }
+
+    def _record_whitelist_change(self, cursor, plate_number):
+        cursor.execute(
+            self.sql("INSERT INTO whitelist_changes (plate_number, change_time) VALUES (%s, %s)"),
+            (plate_number, self.to_db_time(datetime.now()))
+        )
+
+
+class MySQLStorage(Storage):
+    upsert_detection_query = """
+    INSERT INTO detected_vehicles
+    (plate_number, vehicle_type, confidence, capture_path, thumbnail_path, detection_time, updated_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        vehicle_type = VALUES(vehicle_type),
+        capture_path = VALUES(capture_path),
+        thumbnail_path = VALUES(thumbnail_path),
+        detection_time = VALUES(detection_time),
+        confidence = VALUES(confidence),
+        updated_at = VALUES(updated_at)
+    """
+    migrations = [
+        (1, [
+            "CREATE INDEX idx_detected_time ON detected_vehicles (detection_time, id)",
+            "CREATE INDEX idx_whitelist_plate ON whitelist_vehicles (plate_number)"
+        ]),
+        (2, ["ALTER TABLE detected_vehicles ADD COLUMN thumbnail_path VARCHAR(255)"]),
+        (3, [
+            "ALTER TABLE detected_vehicles ADD COLUMN updated_at DATETIME",
+            "CREATE INDEX idx_detected_updated ON detected_vehicles (updated_at, id)"
+        ])
+    ]
+
+    def __init__(self, host='localhost', user='root', password='', database='vehicle_tracking', pool_size=8):
+        """
+        MySQL server backend
+
+        Args:
+            host (str): Server host name
+            user (str): Database user
+            password (str): Database password
+            database (str): Schema name
+            pool_size (int): Connections kept open in the pool
+        """
+        import mysql.connector
+        import mysql.connector.pooling
+        self._mysql = mysql.connector
+        self.driver_error = mysql.connector.Error
+        self.config = {'host': host, 'user': user, 'password': password, 'database': database}
+        self.pool_size = pool_size
+        self._pool = None
+        self._pool_lock = threading.Lock()
+
+    def connect(self):
+        return self._mysql.connect(**self.config)
+
+    def acquire(self):
+        # The pool is created on first use so a server that is down at startup can come up later
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = self._mysql.pooling.MySQLConnectionPool(
+                    pool_name="anpr", pool_size=self.pool_size, **self.config
+                )
+        return self._pool.get_connection()
+
+    def release(self, conn, healthy=True):
+        # Closing a pooled connection returns it to the pool, which reconnects it if needed
+        conn.close()
+
+    def create_tables(self, cursor):
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS detected_vehicles (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                plate_number VARCHAR(20) NOT NULL,
+                vehicle_type VARCHAR(20) NOT NULL,
+                confidence FLOAT NOT NULL,
+                capture_path VARCHAR(255),
+                detection_time DATETIME NOT NULL,
+                UNIQUE KEY uq_detected_plate_number (plate_number)
+            )
+        """)
+        print("Created/verified 'detected_vehicles' table")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS whitelist_vehicles (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                owner_name VARCHAR(60) NOT NULL,
+                plate_number VARCHAR(20) NOT NULL,
+                vehicle_type VARCHAR(20) NOT NULL
+            )
+        """)
+        print("Created/verified 'whitelist_vehicles' table")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS whitelist_changes (
+                id INT AUTO_INCREMENT PRIMARY KEY,
+                plate_number VARCHAR(20) NOT NULL,
+                change_time DATETIME NOT NULL
+            )
+        """)
+        print("Created/verified 'whitelist_changes' table")
+
+    def add_unique_plate_key(self, cursor):
+        """Give detected_vehicles one row per plate so detections can be upserted"""
+        cursor.execute("""
+            SELECT COUNT(*) FROM information_schema.STATISTICS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'detected_vehicles'
+            AND INDEX_NAME = 'uq_detected_plate_number'
+        """)
+        if cursor.fetchone()[0]:
+            return
+
+        # Keep only the highest-confidence row of plates stored more than once
+        cursor.execute("""
+            DELETE older FROM detected_vehicles older
+            JOIN detected_vehicles better
+              ON older.plate_number = better.plate_number
+             AND (older.confidence < better.confidence
+                  OR (older.confidence = better.confidence AND older.id < better.id))
+        """)
+        cursor.execute("ALTER TABLE detected_vehicles ADD UNIQUE KEY uq_detected_plate_number (plate_number)")
+        print("Added unique plate key to 'detected_vehicles' table")
+
+
+class SQLiteStorage(Storage):
+    placeholder = "?"
+    driver_error = sqlite3.Error
+    upsert_detection_query = """
+    INSERT INTO detected_vehicles
+    (plate_number, vehicle_type, confidence, capture_path, thumbnail_path, detection_time, updated_at)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    ON CONFLICT(plate_number) DO UPDATE SET
+        vehicle_type = excluded.vehicle_type,
+        capture_path = excluded.capture_path,
+        thumbnail_path = excluded.thumbnail_path,
+        detection_time = excluded.detection_time,
+        confidence = excluded.confidence,
+        updated_at = excluded.updated_at
+    """
+    TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+    migrations = [
+        (1, [
+            "CREATE INDEX IF NOT EXISTS idx_detected_time ON detected_vehicles (detection_time, id)",
+            "CREATE INDEX IF NOT EXISTS idx_whitelist_plate ON whitelist_vehicles (plate_number)"
+        ]),
+        (2, ["ALTER TABLE detected_vehicles ADD COLUMN thumbnail_path TEXT"]),
+        (3, [
+            "ALTER TABLE detected_vehicles ADD COLUMN updated_at TEXT",
+            "CREATE INDEX IF NOT EXISTS idx_detected_updated ON detected_vehicles (updated_at, id)"
+        ])
+    ]
+
+    def __init__(self, path='vehicle_tracking.db', pool_size=4):
+        """
+        Embedded SQLite backend in WAL mode, for single-node installs without a DB server
+
+        Args:
+            path (str): Database file path
+            pool_size (int): Idle connections kept open for reuse
+        """
+        self.path = path
+        self.pool_size = pool_size
+        self._pool = queue.LifoQueue()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def connect(self):
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def acquire(self):
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self.connect()
+
+    def release(self, conn, healthy=True):
+        if healthy and self._pool.qsize() < self.pool_size:
+            self._pool.put(conn)
+        else:
+            conn.close()
+
+    def to_db_time(self, value):
+        return value.strftime(self.TIME_FORMAT) if isinstance(value, datetime) else value
+
+    def from_db_time(self, value):
+        return datetime.strptime(value, self.TIME_FORMAT) if isinstance(value, str) else value
+
+    def create_tables(self, cursor):
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS detected_vehicles (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                plate_number TEXT NOT NULL UNIQUE,
+                vehicle_type TEXT NOT NULL,
+                confidence REAL NOT NULL,
+                capture_path TEXT,
+                detection_time TEXT NOT NULL
+            )
+        """)
+        print("Created/verified 'detected_vehicles' table")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS whitelist_vehicles (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                owner_name TEXT NOT NULL,
+                plate_number TEXT NOT NULL,
+                vehicle_type TEXT NOT NULL
+            )
+        """)
+        print("Created/verified 'whitelist_vehicles' table")
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS whitelist_changes (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                plate_number TEXT NOT NULL,
+                change_time TEXT NOT NULL
+            )
+        """)
+        print("Created/verified 'whitelist_changes' table")
+
+    def add_unique_plate_key(self, cursor):
+        # SQLite tables are created with the unique constraint from the start
+        pass
+
+
+def create_storage(backend=None):
+    """
+    Build the storage backend selected by the environment
+
+    ANPR_DB_BACKEND chooses "mysql" (default) or "sqlite". MySQL uses
+    ANPR_DB_HOST (default localhost), ANPR_DB_USER (default root),
+    ANPR_DB_PASSWORD (default empty, set it for any server with a password)
+    and ANPR_DB_NAME (default vehicle_tracking); SQLite uses
+    ANPR_SQLITE_PATH. ANPR_DB_POOL_SIZE sets the connection pool size.
+
+    Args:
+        backend (str): Overrides ANPR_DB_BACKEND
+
+    Returns:
+        Storage: Configured backend
+    """
+    backend = (backend or os.getenv('ANPR_DB_BACKEND', 'mysql')).lower()
+    pool_size = os.getenv('ANPR_DB_POOL_SIZE')
+    if backend == 'sqlite':
+        return SQLiteStorage(
+            os.getenv('ANPR_SQLITE_PATH', 'vehicle_tracking.db'),
+            pool_size=int(pool_size or 4)
+        )
+    if backend == 'mysql':
+        return MySQLStorage(
+            host=os.getenv('ANPR_DB_HOST', 'localhost'),
+            user=os.getenv('ANPR_DB_USER', 'root'),
+            password=os.getenv('ANPR_DB_PASSWORD', ''),
+            database=os.getenv('ANPR_DB_NAME', 'vehicle_tracking'),
+            pool_size=int(pool_size or 8)
+        )
+    raise ValueError(f"Unknown storage backend: {backend}")
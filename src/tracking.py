@@ -0,0 +1,249 @@
+import cv2
+import numpy as np
+
+from src.plate_vote import PlateVote
+
+
+def iou(box_a, box_b):
+    """
+    Intersection over union of two boxes
+
+    Args:
+        box_a (sequence): x1, y1, x2, y2
+        box_b (sequence): x1, y1, x2, y2
+
+    Returns:
+        float: Overlap between 0 and 1
+    """
+    inter_w = min(box_a[2], box_b[2]) - max(box_a[0], box_b[0])
+    inter_h = min(box_a[3], box_b[3]) - max(box_a[1], box_b[1])
+    if inter_w <= 0 or inter_h <= 0:
+        return 0.0
+    intersection = inter_w * inter_h
+    area_a = (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+    area_b = (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+    return intersection / float(area_a + area_b - intersection)
+
+
+def plate_sharpness(plate_image):
+    """Variance of the Laplacian, higher for sharper plate crops"""
+    if plate_image is None or plate_image.size == 0:
+        return 0.0
+    gray = cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY) if plate_image.ndim == 3 else plate_image
+    return float(cv2.Laplacian(gray, cv2.CV_64F).var())
+
+
+class KalmanBoxTracker:
+    def __init__(self, box, track_id, timestamp):
+        """
+        Constant-velocity Kalman filter over a bounding box, as in SORT
+
+        The state is box centre, area and aspect ratio plus the velocities of
+        centre and area.
+
+        Args:
+            box (sequence): x1, y1, x2, y2 of the first detection
+            track_id (int): Identifier of the track
+            timestamp (float): Time of the first detection
+        """
+        self.track_id = track_id
+        self.hits = 1
+        self.last_seen = timestamp
+        self.box = list(box)
+
+        self.F = np.eye(7)
+        self.F[0, 4] = self.F[1, 5] = self.F[2, 6] = 1
+        self.H = np.eye(4, 7)
+        self.R = np.eye(4)
+        self.R[2:, 2:] *= 10.0
+        self.P = np.eye(7) * 10.0
+        self.P[4:, 4:] *= 1000.0  # velocities are unknown at first
+        self.Q = np.eye(7)
+        self.Q[4:, 4:] *= 0.01
+        self.Q[6, 6] *= 0.01
+        self.x = np.zeros((7, 1))
+        self.x[:4] = self._to_measurement(box)
+
+        # OCR bookkeeping, used to decide whether a new crop is worth reading
+        self.vote = PlateVote()
+        # Plate text emitted for this track, set once the vote is stable
+        self.plate_number = None
+        # Most confident vehicle detection and its frame, persisted if the track ends unsettled
+        self.best_vehicle = None
+        self.best_frame = None
+        self.best_plate_area = 0
+        self.best_plate_sharpness = 0.0
+        self.ocr_calls = 0
+        self.frames_since_ocr = 0
+
+    @staticmethod
+    def _to_measurement(box):
+        width = box[2] - box[0]
+        height = box[3] - box[1]
+        return np.array([[box[0] + width / 2.0], [box[1] + height / 2.0],
+                         [width * height], [width / float(height) if height else 1.0]])
+
+    def _to_box(self):
+        center_x, center_y, area, ratio = self.x[:4, 0]
+        width = np.sqrt(max(area * ratio, 0.0))
+        height = area / width if width else 0.0
+        return [center_x - width / 2.0, center_y - height / 2.0, center_x + width / 2.0, center_y + height / 2.0]
+
+    def predict(self):
+        """Advance the state by one step and return the predicted box"""
+        if self.x[2, 0] + self.x[6, 0] <= 0:
+            self.x[6, 0] = 0.0
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + self.Q
+        return self._to_box()
+
+    def update(self, box, timestamp):
+        """Correct the state with a matched detection"""
+        residual = self._to_measurement(box) - self.H @ self.x
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ residual
+        self.P = (np.eye(7) - K @ self.H) @ self.P
+        self.box = list(box)
+        self.hits += 1
+        self.last_seen = timestamp
+
+    def needs_ocr(self, plate_image, growth=1.3, sharpening=1.5, retry_frames=2):
+        """
+        Decide whether a plate crop of this track should go through OCR
+
+        Only tracks whose plate has not settled are read: a new track, a crop
+        clearly larger or sharper than the best one read so far, or every few
+        frames. Once plate_number is set the vote is final, so further reads
+        would be thrown away.
+
+        Args:
+            plate_image (numpy.ndarray): Plate crop of the current frame
+            growth (float): Area ratio that counts as clearly larger
+            sharpening (float): Sharpness ratio that counts as clearly sharper
+            retry_frames (int): Frames between attempts while the vote is unsettled
+
+        Returns:
+            bool: True if OCR should run on this crop
+        """
+        if self.plate_number is not None:
+            return False
+        self.frames_since_ocr += 1
+        if self.ocr_calls == 0:
+            return True
+        area = plate_image.shape[0] * plate_image.shape[1]
+        if area > self.best_plate_area * growth:
+            return True
+        if plate_sharpness(plate_image) > self.best_plate_sharpness * sharpening:
+            return True
+        return self.frames_since_ocr >= retry_frames
+
+    def record_ocr(self, plate_image, plate_number, confidence):
+        """
+        Remember the crop quality of an OCR run on this track and add its text to the vote
+
+        Returns:
+            bool: True if this reading settled the vote and set plate_number
+        """
+        self.ocr_calls += 1
+        self.frames_since_ocr = 0
+        self.best_plate_area = max(self.best_plate_area, plate_image.shape[0] * plate_image.shape[1])
+        self.best_plate_sharpness = max(self.best_plate_sharpness, plate_sharpness(plate_image))
+        if plate_number:
+            self.vote.add(plate_number, confidence)
+        if self.plate_number is None and self.vote.is_stable():
+            self.plate_number, _ = self.vote.result()
+            return True
+        return False
+
+    def final_plate(self):
+        """
+        Plate text to emit when the track ends before its vote settled
+
+        Returns:
+            str: Consensus text if it has enough agreement, otherwise None
+        """
+        if self.plate_number is not None:
+            return None
+        plate_number, agreement = self.vote.result()
+        if plate_number and agreement >= self.vote.min_agreement:
+            return plate_number
+        return None
+
+
+class MultiObjectTracker:
+    def __init__(self, iou_threshold=0.3, max_age=1.5):
+        """
+        SORT-style tracker giving each vehicle a persistent track ID across frames
+
+        Args:
+            iou_threshold (float): Minimum overlap between a prediction and a detection to match
+            max_age (float): Seconds a track survives without a matching detection
+        """
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.tracks = []
+        # Tracks dropped by the latest update, for callers that finalize them
+        self.expired = []
+        self._next_id = 1
+
+    def update(self, boxes, timestamp):
+        """
+        Match detections to existing tracks and start tracks for the rest
+
+        Args:
+            boxes (list): x1, y1, x2, y2 of the detections in this frame
+            timestamp (float): Time of the frame
+
+        Returns:
+            list: KalmanBoxTracker for each input box, in the same order
+        """
+        self.expired = self.expire(timestamp)
+        predictions = [track.predict() for track in self.tracks]
+
+        # Greedy matching on IoU, best pairs first
+        pairs = sorted(
+            ((iou(prediction, box), track_index, box_index)
+             for track_index, prediction in enumerate(predictions)
+             for box_index, box in enumerate(boxes)),
+            reverse=True
+        )
+        assigned = [None] * len(boxes)
+        used_tracks = set()
+        for overlap, track_index, box_index in pairs:
+            if overlap < self.iou_threshold:
+                break
+            if track_index in used_tracks or assigned[box_index] is not None:
+                continue
+            track = self.tracks[track_index]
+            track.update(boxes[box_index], timestamp)
+            assigned[box_index] = track
+            used_tracks.add(track_index)
+
+        for box_index, box in enumerate(boxes):
+            if assigned[box_index] is None:
+                track = KalmanBoxTracker(box, self._next_id, timestamp)
+                self._next_id += 1
+                self.tracks.append(track)
+                assigned[box_index] = track
+        return assigned
+
+    def expire(self, timestamp):
+        """
+        Drop the tracks not seen for max_age seconds
+
+        Returns:
+            list: The dropped tracks
+        """
+        expired = [track for track in self.tracks if timestamp - track.last_seen > self.max_age]
+        if expired:
+            self.tracks = [track for track in self.tracks if timestamp - track.last_seen <= self.max_age]
+        return expired
+
+    @property
+    def created(self):
+        """Number of tracks started so far"""
+        return self._next_id - 1
+
+    def active_tracks(self, timestamp):
+        return [track for track in self.tracks if timestamp - track.last_seen <= self.max_age]
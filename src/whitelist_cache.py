@@ -0,0 +1,115 @@
+import threading
+
+from src.plate_utils import normalize_plate_number
+from src.storage import StorageError
+
+
+class WhitelistCache:
+    def __init__(self, storage, refresh_interval=2.0):
+        """
+        In-memory index of whitelisted plates
+
+        The whole whitelist is loaded once; afterwards a background thread reads
+        only the rows appended to the whitelist_changes log since the last
+        version it has seen and re-checks the affected plates. Lookups are a
+        set membership test with no database round-trip.
+
+        Args:
+            storage (Storage): Storage backend holding the whitelist
+            refresh_interval (float): Seconds between change-log checks
+        """
+        self.storage = storage
+        self.refresh_interval = refresh_interval
+        self.version = 0
+        self.loaded = False
+        self._plates = frozenset()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def __contains__(self, plate_number):
+        return normalize_plate_number(plate_number) in self._plates
+
+    def __len__(self):
+        return len(self._plates)
+
+    def contains(self, plate_number):
+        """
+        Check whether a plate is whitelisted
+
+        Args:
+            plate_number (str): Plate number, normalized or not
+
+        Returns:
+            bool: True if the plate is in the whitelist
+        """
+        return plate_number in self
+
+    def start(self):
+        """Load the whitelist and start the background refresh thread"""
+        self.load()
+        self._thread = threading.Thread(target=self._run, name="whitelist-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    def notify_changed(self):
+        """Ask the refresh thread to pick up changes now instead of at the next interval"""
+        self._wake.set()
+
+    def load(self) -> bool:
+        """
+        Replace the cache with the full contents of whitelist_vehicles
+
+        Returns:
+            bool: True if the whitelist was loaded
+        """
+        with self._lock:
+            try:
+                version, plates = self.storage.whitelist_snapshot()
+            except StorageError as err:
+                print(f"Error loading whitelist: {err}")
+                return False
+
+            self._plates = frozenset(plates)
+            self.version = version
+            self.loaded = True
+            print(f"Loaded {len(plates)} whitelisted plates (version {version})")
+            return True
+
+    def refresh(self) -> bool:
+        """
+        Apply whitelist changes recorded after the cached version
+
+        Returns:
+            bool: True if the cache is up to date
+        """
+        with self._lock:
+            try:
+                version, changed, present = self.storage.whitelist_changes_since(self.version)
+            except StorageError as err:
+                print(f"Error refreshing whitelist: {err}")
+                return False
+            if not changed:
+                return True
+
+            self._plates = (self._plates - changed) | present
+            self.version = version
+            print(f"Whitelist updated to version {self.version}: {len(self._plates)} plates")
+            return True
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            self._wake.wait(self.refresh_interval)
+            self._wake.clear()
+            if self._stop_event.is_set():
+                break
+            if self.loaded:
+                self.refresh()
+            else:
+                self.load()
@@ -1,5 +1,7 @@
 // ANPR data
 let plateData = [];
+let nextCursor = null;
+const PAGE_SIZE = 100;
 
 let whitelistEntries = [];
 let selectedEntry = null;
@@ -13,15 +15,40 @@ const whitelistForm = document.getElementById('whitelistForm');
 const closeButtons = document.querySelectorAll('.close-button');
 const confirmButton = document.getElementById('confirmButton');
 const cancelButton = document.getElementById('cancelButton');
+const loadMoreButton = document.getElementById('loadMoreButton');
 
-fetch('/get_data')
-  .then(response => response.json())
-  .then(data => {
-    plateData = data;
-    console.log(plateData); 
-    renderANPRTable();
-  })
-  .catch(error => console.error('Error fetching data:', error));
+// Fetch one page of detections; older pages are requested with the cursor of the previous one
+function fetchDetections(cursor = null) {
+  const params = new URLSearchParams({ limit: PAGE_SIZE });
+  if (cursor) {
+    params.set('cursor', cursor);
+  }
+  fetch(`/get_data?${params}`)
+    .then(response => response.json())
+    .then(data => {
+      plateData = cursor ? plateData.concat(data.items) : data.items;
+      nextCursor = data.nextCursor;
+      loadMoreButton.hidden = !nextCursor;
+      renderANPRTable();
+    })
+    .catch(error => console.error('Error fetching data:', error));
+}
+
+fetchDetections();
+
+loadMoreButton.addEventListener('click', () => {
+  if (nextCursor) {
+    fetchDetections(nextCursor);
+  }
+});
+
+// Live updates: new detections are pushed by the server, an updated plate replaces its row
+const detectionEvents = new EventSource('/events');
+detectionEvents.addEventListener('detection', (event) => {
+  const record = JSON.parse(event.data);
+  plateData = [record].concat(plateData.filter(existing => existing.id !== record.id));
+  renderANPRTable();
+});
 
 function getConfidenceClass(score) {
   if (score >= 80) return 'confidence-high';
@@ -69,6 +96,7 @@ function renderANPRTable() {
     tbody.innerHTML = plateData.slice().reverse().map(record => {
         // Normalize the image path by replacing backslashes with forward slashes
         const normalizedImagePath = record.image.replace(/\\/g, '/');
+        const normalizedThumbnailPath = record.thumbnail.replace(/\\/g, '/');
         return `
         <tr>
             <td>${record.id}</td>
@@ -79,7 +107,7 @@ function renderANPRTable() {
                 ${record.confidenceScore}%
                 </span>
             </td>
-            <td><img src="${normalizedImagePath}" alt="${record.plateNo}" onclick="handleImageClick('${normalizedImagePath}')"></td>
+            <td><img src="${normalizedThumbnailPath}" loading="lazy" alt="${record.plateNo}" onclick="handleImageClick('${normalizedImagePath}')"></td>
             <td>${record.detectionTime}</td>
             <td><a href="https://www.carinfo.app/rc-details/${record.plateNo}">Link</a></td>
         </tr>
@@ -208,5 +236,41 @@ cancelButton.addEventListener('click', () => {
     selectedEntry = null;
 });
 
+// Live pipeline metrics, refreshed every few seconds
+const METRICS_REFRESH_MS = 5000;
+
+function formatMetricValue(value) {
+    if (typeof value === 'object') {
+        return `${value.count} × ${value.mean_ms} ms`;
+    }
+    return Number.isInteger(value) ? value : value.toFixed(2);
+}
+
+function renderMetricsTable(summary) {
+    const tbody = document.querySelector('#metricsTable tbody');
+    tbody.innerHTML = '';
+    Object.entries(summary).forEach(([name, values]) => {
+        Object.entries(values).forEach(([label, value]) => {
+            const row = document.createElement('tr');
+            row.innerHTML = `
+                <td>${name.replace(/^anpr_/, '')}</td>
+                <td>${label}</td>
+                <td>${formatMetricValue(value)}</td>
+            `;
+            tbody.appendChild(row);
+        });
+    });
+}
+
+function fetchMetrics() {
+    fetch('/metrics/summary')
+    .then(response => response.json())
+    .then(renderMetricsTable)
+    .catch(error => console.error('Error fetching metrics:', error));
+}
+
+fetchMetrics();
+setInterval(fetchMetrics, METRICS_REFRESH_MS);
+
 // Initialize the application
 initializeTables();
\ No newline at end of file